@@ -1,11 +1,12 @@
 from fastapi import FastAPI, APIRouter, UploadFile, File, Form, Depends, Body
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi_limiter import FastAPILimiter
 from fastapi_limiter.depends import RateLimiter
 from redis.asyncio import Redis
 from contextlib import asynccontextmanager
 from core.scraping import scrape_multiple_websites, crawl
 from urllib.parse import urlparse
+from typing import Tuple
 
 
 # Updated imports for new knowledge base manager
@@ -52,6 +53,7 @@ from core import (
     LLMClient,
     ToolManager, Config
 )
+from core.llm_client import create_shared_session
 from core.cs_tools import ToolManager as CSToolManager
 from core.customer_support_agent import CustomerSupportAgent
 from core.logging_security import (
@@ -105,13 +107,43 @@ def coerce_or_drop_team_id(md: dict) -> dict:
     logging.warning("Dropped unknown complex team_id for global/system upload", extra={"team_preview": str(tid)[:300]})
     return md
 
+def _build_customer_support_agent(llm_session) -> Tuple[CustomerSupportAgent, CSToolManager]:
+    """Construct the CustomerSupportAgent and its tool manager (plain object setup, no I/O)"""
+    logging.info("📞 Creating CustomerSupportAgent")
+    
+    # Customer bot model configs
+    customer_bot_analysis_config = config.create_llm_config(
+        provider=settings.customer_bot_analysis_provider,
+        model=settings.customer_bot_analysis_model,
+        max_tokens=16000
+    )
+    
+    customer_bot_response_config = config.create_llm_config(
+        provider=settings.customer_bot_response_provider,
+        model=settings.customer_bot_response_model,
+        max_tokens=1000
+    )
+    
+    customer_bot_analysis_llm = LLMClient(customer_bot_analysis_config, session=llm_session)
+    customer_bot_response_llm = LLMClient(customer_bot_response_config, session=llm_session)
+    
+    # CustomerSupportAgent uses CSToolManager; its HTTP tools share the pooled LLM session
+    cs_tool_manager = CSToolManager(session=llm_session)
+    
+    cs_agent = CustomerSupportAgent(
+        brain_llm=customer_bot_analysis_llm,
+        heart_llm=customer_bot_response_llm,
+        tool_manager=cs_tool_manager
+    )
+    logging.info("✅ CustomerSupportAgent initialized")
+    return cs_agent, cs_tool_manager
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     
     logging.info("⚡ Starting app lifespan...")
     
     global agent, org_manager, kb_manager
-    config = Config()
 
     redis_client = Redis(
         host=os.getenv('REDIS_HOST'), 
@@ -120,28 +152,14 @@ async def lifespan(app: FastAPI):
         username=os.getenv('REDIS_USERNAME'), 
         password=os.getenv('REDIS_PASSWORD')
     )
-    await FastAPILimiter.init(redis_client)
-    
     web_model_config = config.get_tool_configs(
         web_model=settings.web_model,
         use_premium_search=settings.use_premium_search
     )
-    
-    # Customer bot model configs
-    customer_bot_analysis_config = config.create_llm_config(
-        provider=settings.customer_bot_analysis_provider,
-        model=settings.customer_bot_analysis_model,
-        max_tokens=16000
-    )
-    
-    customer_bot_response_config = config.create_llm_config(
-        provider=settings.customer_bot_response_provider,
-        model=settings.customer_bot_response_model,
-        max_tokens=1000
-    )
 
-    customer_bot_analysis_llm = LLMClient(customer_bot_analysis_config)
-    customer_bot_response_llm = LLMClient(customer_bot_response_config)
+
+    # One pooled session for every LLM client and support tool - mostly the same few hosts
+    llm_session = create_shared_session()
     tool_manager = ToolManager(config, web_model_config, settings.use_premium_search)
 
     # Initialize language detector if enabled
@@ -149,7 +167,7 @@ async def lifespan(app: FastAPI):
     if config.language_detection_enabled:
         try:
             lang_detect_config = config.create_language_detection_config()
-            language_detector_llm = LLMClient(lang_detect_config)
+            language_detector_llm = LLMClient(lang_detect_config, session=llm_session)
             logging.info("🌍 Language Detection Layer initialized successfully")
         except Exception as e:
             logging.warning(f"⚠️ Language detection initialization failed: {e}. Continuing without language detection.")
@@ -157,17 +175,7 @@ async def lifespan(app: FastAPI):
 
     # Create CustomerSupportAgent (only agent for this version)
     global agent
-    logging.info("📞 Creating CustomerSupportAgent")
-    
-    # CustomerSupportAgent uses CSToolManager (simple initialization, no params needed)
-    cs_tool_manager = CSToolManager()
-    
-    agent = CustomerSupportAgent(
-        brain_llm=customer_bot_analysis_llm,
-        heart_llm=customer_bot_response_llm,
-        tool_manager=cs_tool_manager
-    )
-    logging.info("✅ CustomerSupportAgent initialized")
+    agent, cs_tool_manager = _build_customer_support_agent(llm_session)
     
     # Initialize Organization Manager
     mongo_client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'))
@@ -192,8 +200,11 @@ async def lifespan(app: FastAPI):
         embedding_function=embedding_function,
         database_name="knowledge_base"
     )
-    # Create global collection using module-level helper
-    await create_global_collection()
+    # Rate limiter setup (Redis) and global collection creation (Mongo/Chroma) are independent
+    await asyncio.gather(
+        FastAPILimiter.init(redis_client),
+        create_global_collection()
+    )
     
     logging.info("✅ Organization Manager and Knowledge Base Manager initialized")
 
@@ -207,13 +218,15 @@ async def lifespan(app: FastAPI):
     finally:
         logging.info("⚡ Shutting down app lifespan...")
         
-        # Cleanup tool resources
+        # Cleanup tool resources (both managers close before the shared session they use)
         try:
-            await tool_manager.cleanup()
+            await asyncio.gather(tool_manager.cleanup(), cs_tool_manager.cleanup())
             logging.info("✅ Tool resources cleaned up")
         except Exception as e:
             logging.warning(f"⚠️ Error during tool cleanup: {e}")
         
+        await llm_session.close()
+        
         agent.worker_task.cancel()
         try:
             await agent.worker_task
@@ -317,6 +330,26 @@ async def chat_brain_heart_system(request: ChatMessage = Body(...)):
         )
 
 
+@router.post("/chat/stream", dependencies=[Depends(RateLimiter(times=6, seconds=60))])
+async def chat_stream_endpoint(request: ChatMessage = Body(...)):
+    """Chat endpoint that streams the CustomerSupportAgent reply as server-sent events"""
+    chat_history = request.chat_history[-4:] if request.chat_history else []
+    
+    safe_log_user_data(request.userid, 'brain_heart_chat_stream', message_count=len(request.user_query))
+    
+    async def event_stream():
+        # delta events carry raw text; the final done event carries the cleaned reply
+        try:
+            async for event in agent.process_query_stream(request.user_query, chat_history, request.userid):
+                payload = {key: value for key, value in event.items() if key != "type"}
+                yield f"event: {event['type']}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            logging.error(f"❌ Chat stream failed: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': 'Internal error while streaming the response'})}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 # ============================================================================
 # KNOWLEDGE BASE / COLLECTION ENDPOINTS (NEW IMPLEMENTATION)
 # ============================================================================
@@ -377,14 +410,17 @@ async def get_collections_endpoint(
     List all collections accessible to a user in an organization.
     """
     try:
-        result = await list_collections(
-            org_id=org_id,
-            user_id=user_id,
-            team_id=team_id
-        )
-        global_result = await list_collections(
-            org_id="org_global",
-            user_id="system"
+        # The org and global listings are independent reads - fetch them together
+        result, global_result = await asyncio.gather(
+            list_collections(
+                org_id=org_id,
+                user_id=user_id,
+                team_id=team_id
+            ),
+            list_collections(
+                org_id="org_global",
+                user_id="system"
+            )
         )
         
         if result.get("success"):
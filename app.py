@@ -13,6 +13,7 @@ import os
 import shutil
 import threading
 import logging
+from collections import deque
 from datetime import datetime, timezone
 from typing import Dict, Any, Optional, List
 import sys
@@ -36,6 +37,9 @@ load_dotenv()
 
 import requests
 
+# Messages kept in the UI session (user + assistant turns)
+CHAT_HISTORY_LIMIT = int(os.getenv("CHAT_HISTORY_LIMIT", "20"))
+
 
 
 def upload_local_files(user_id: str, collection_name: str, file_paths: list[str]):
@@ -1209,7 +1213,8 @@ def main():
     
     # Initialize chat history
     if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
+        # Ring buffer: oldest turns drop off without re-copying the list each message
+        st.session_state.chat_history = deque(maxlen=CHAT_HISTORY_LIMIT)
         logger.info(f"Initialized chat history for user: {get_user_id()}")
     
     # Header
@@ -1380,7 +1385,7 @@ def main():
     # Sidebar configuration
     with st.sidebar:
         if st.button("🗑️ Clear Chat History"):
-            st.session_state['chat_history'] = []  
+            st.session_state['chat_history'] = deque(maxlen=CHAT_HISTORY_LIMIT)
             st.success("Chat cleared!")
             st.rerun()
                         
@@ -1848,7 +1853,7 @@ def main():
                         query, 
                         style,
                         user_id=query_target_id,
-                        chat_history=st.session_state.chat_history,
+                        chat_history=list(st.session_state.chat_history),
                         source="website" 
                     ))
                     
@@ -9,6 +9,7 @@ __version__ = "2.0.0"
 from .exceptions import (
     BrainHeartException,
     LLMClientError,
+    LLMAPIError,
     BrainAgentError,
     HeartAgentError,
     ToolExecutionError,
@@ -50,6 +51,7 @@ except ImportError:
 __all__ = [
     'BrainHeartException',
     'LLMClientError', 
+    'LLMAPIError',
     'BrainAgentError',
     'HeartAgentError',
     'ToolExecutionError',
@@ -14,6 +14,13 @@ from typing import Callable, Coroutine, Tuple, Any
 
 logger = logging.getLogger(__name__)
 
+# Provider-specific API base URLs (providers not listed use their client defaults)
+PROVIDER_BASE_URLS = {
+    'openrouter': "https://openrouter.ai/api/v1",
+    'groq': "https://api.groq.com/openai/v1",
+    'deepseek': "https://api.deepseek.com/v1",
+}
+
 
 
 
@@ -23,7 +30,7 @@ class AddBackgroundTask:
     func: Callable[..., Coroutine[Any, Any, Any]]
     params: Tuple[Any, ...]
 
-@dataclass
+@dataclass(frozen=True)
 class LLMConfig:
     """Configuration for LLM models"""
     provider: str
@@ -39,6 +46,7 @@ class Config:
     
     def __init__(self):
         self.available_providers: Dict[str, str] = {}
+        self._llm_configs: Dict[Tuple[str, str, int], LLMConfig] = {}
         self.available_models: Dict[str, List[str]] = {}
         self.available_web_models: List[str] = [
             "perplexity/sonar",
@@ -51,11 +59,6 @@ class Config:
         self.language_detection_provider = os.getenv('LANGUAGE_DETECTION_PROVIDER', 'openrouter')
         self.language_detection_model = os.getenv('LANGUAGE_DETECTION_MODEL', 'google/gemini-2.5-flash-lite-preview-09-2025')
         
-        # Language detection configuration
-        self.language_detection_enabled = os.getenv('LANGUAGE_DETECTION_ENABLED', 'false').lower() == 'true'
-        self.language_detection_provider = os.getenv('LANGUAGE_DETECTION_PROVIDER', 'openrouter')
-        self.language_detection_model = os.getenv('LANGUAGE_DETECTION_MODEL', 'google/gemini-2.5-flash-lite-preview-09-2025')
-        
         self.load_configuration()
     
     def load_configuration(self):
@@ -78,7 +81,7 @@ class Config:
             api_key = os.getenv(env_key)
             if api_key:
                 self.available_providers[provider] = api_key
-                print(f"✅ Detected {provider.upper()} API key")
+                logger.info(f"✅ Detected {provider.upper()} API key")
         
         if not self.available_providers:
             raise Exception("No LLM provider API keys found. Please set at least one API key in .env file.")
@@ -119,24 +122,17 @@ class Config:
         if provider not in self.available_providers:
             raise Exception(f"Provider {provider} not available")
         
-        api_key = self.available_providers[provider]
-        
-        # Provider-specific configurations
-        base_url = None
-        if provider == 'openrouter':
-            base_url = "https://openrouter.ai/api/v1"
-        elif provider == 'groq':
-            base_url = "https://api.groq.com/openai/v1"
-        elif provider == 'deepseek':
-            base_url = "https://api.deepseek.com/v1"
-        
-        return LLMConfig(
-            provider=provider,
-            model=model,
-            api_key=api_key,
-            max_tokens=max_tokens,
-            base_url=base_url
-        )
+        # LLMConfig is immutable, so identical requests can share one instance
+        key = (provider, model, max_tokens)
+        if key not in self._llm_configs:
+            self._llm_configs[key] = LLMConfig(
+                provider=provider,
+                model=model,
+                api_key=self.available_providers[provider],
+                max_tokens=max_tokens,
+                base_url=PROVIDER_BASE_URLS.get(provider)
+            )
+        return self._llm_configs[key]
     
     def get_tool_configs(self, web_model: str = None, use_premium_search: bool = False) -> Dict[str, Any]:
 
@@ -156,9 +152,9 @@ class Config:
         llmlayer_key = os.getenv('LLMLAYER_API_KEY')
         llmlayer_url = os.getenv('LLMLAYER_API_URL', 'https://api.llmlayer.dev/api/v2/answer')
         
-        print(f"🔍 DEBUG: JINA_API_KEY from env: {jina_key[:20] if jina_key else '❌ NOT FOUND IN ENV!'}")
-        print(f"🌐 DEBUG: LLMLAYER_ENABLED: {llmlayer_enabled}")
-        print(f"🌐 DEBUG: LLMLAYER_API_KEY: {llmlayer_key[:20] if llmlayer_key else '❌ NOT FOUND!'}")
+        logger.debug(f"🔍 JINA_API_KEY from env: {'set' if jina_key else '❌ NOT FOUND IN ENV!'}")
+        logger.debug(f"🌐 LLMLAYER_ENABLED: {llmlayer_enabled}")
+        logger.debug(f"🌐 LLMLAYER_API_KEY: {'set' if llmlayer_key else '❌ NOT FOUND!'}")
 
         
         # Web search is enabled ONLY if explicitly enabled AND we have API keys
@@ -201,8 +197,8 @@ class Config:
             }
         }
         
-        print(f"🚀 Premium search enabled: {use_premium_search}")
-        print(f"🔍 Web search enabled: {web_search_enabled}")
+        logger.debug(f"🚀 Premium search enabled: {use_premium_search}")
+        logger.debug(f"🔍 Web search enabled: {web_search_enabled}")
         
         return tools
     
@@ -218,44 +214,13 @@ class Config:
         if self.language_detection_provider not in self.available_providers:
             raise ValueError(f"Language detection provider '{self.language_detection_provider}' not available")
         
-        api_key = self.available_providers[self.language_detection_provider]
-        
-        # Provider-specific base URL
-        base_url = None
-        if self.language_detection_provider == 'openrouter':
-            base_url = 'https://openrouter.ai/api/v1'
-        
-        return LLMConfig(
-            provider=self.language_detection_provider,
-            model=self.language_detection_model,
-            api_key=api_key,
-            max_tokens=500,  # Language detection needs minimal tokens
-            timeout=30,  # Fast model, shorter timeout
-            base_url=base_url
-        )
-    
-    def create_language_detection_config(self) -> LLMConfig:
-        """Create LLM configuration for language detection layer"""
-        if not self.language_detection_enabled:
-            raise ValueError("Language detection is disabled in configuration")
-        
-        if self.language_detection_provider not in self.available_providers:
-            raise ValueError(f"Language detection provider '{self.language_detection_provider}' not available")
-        
-        api_key = self.available_providers[self.language_detection_provider]
-        
-        # Provider-specific base URL
-        base_url = None
-        if self.language_detection_provider == 'openrouter':
-            base_url = 'https://openrouter.ai/api/v1'
-        
         return LLMConfig(
             provider=self.language_detection_provider,
             model=self.language_detection_model,
-            api_key=api_key,
+            api_key=self.available_providers[self.language_detection_provider],
             max_tokens=500,  # Language detection needs minimal tokens
             timeout=30,  # Fast model, shorter timeout
-            base_url=base_url
+            base_url=PROVIDER_BASE_URLS.get(self.language_detection_provider)
         )
     
     def to_dict(self) -> Dict[str, Any]:
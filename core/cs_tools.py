@@ -5,6 +5,7 @@ import os
 import base64
 import json
 import io
+import re
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 from abc import ABC, abstractmethod
@@ -12,10 +13,52 @@ from dotenv import load_dotenv
 from PIL import Image
 import piexif
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+VISION_TIMEOUT = aiohttp.ClientTimeout(total=60)
+# Outermost {...} in a model reply, fenced or not
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+# Static vision prompt parts, built once at import
+_VISION_SYSTEM_PROMPT = """You are a customer support image analyst. Analyze product images to assess damage, defects, or issues.
+
+Your job is to:
+1. Describe what you see in the image
+2. Identify any visible damage, defects, or quality issues
+3. Assess severity (none, minor, moderate, severe)
+4. Determine if the image supports the customer's claim
+5. Provide a recommendation for the support team
+
+IMPORTANT: Be objective and factual. Only report what you can actually see in the image."""
+
+_VISION_JSON_FORMAT = """Please provide your analysis in the following JSON format:
+{
+    "damage_detected": true/false,
+    "damage_type": "physical_damage" | "defect" | "wrong_item" | "quality_issue" | "missing_parts" | "no_issue",
+    "severity": "none" | "minor" | "moderate" | "severe",
+    "description": "detailed description of what you see",
+    "matches_customer_claim": true/false/null (null if no claim provided),
+    "confidence": 0.0-1.0,
+    "recommendation": "approve_refund" | "approve_replacement" | "request_more_images" | "escalate_to_human" | "deny_claim",
+    "reasoning": "explanation for your recommendation"
+}
+
+Respond ONLY with the JSON object, no other text."""
+
+
+def _json_loads(data):
+    """Parse JSON with orjson when available (raises json.JSONDecodeError either way)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 class BaseTool(ABC):
     """Base class for all tools"""
@@ -31,6 +74,16 @@ class BaseTool(ABC):
         """Execute the tool with given parameters"""
         pass
     
+    async def close(self):
+        """Release tool resources (no-op for tools without any)"""
+        pass
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+    
     def get_info(self) -> Dict[str, Any]:
         """Get tool information"""
         return {
@@ -49,14 +102,17 @@ class BaseTool(ABC):
 class LiveInformationTool(BaseTool):
     """Search for current real-time information (order status, product availability, etc.)"""
     
-    def __init__(self, api_base_url: str = None, api_key: str = None):
+    def __init__(self, api_base_url: str = None, api_key: str = None,
+                 session: Optional[aiohttp.ClientSession] = None):
         super().__init__(
             "live_information",
             "Get real-time order and customer information. Use for: order status lookup, tracking information, order history, customer profile. When customer asks about their order location, status, or delivery details."
         )
         self.api_base_url = api_base_url
         self.api_key = api_key
-        self.session = None
+        # Shared session from ToolManager when given; otherwise created lazily and owned here
+        self.session = session
+        self._owns_session = session is None
         
         logger.info("LiveInformationTool initialized")
     
@@ -187,7 +243,7 @@ class LiveInformationTool(BaseTool):
     
     async def close(self):
         """Close HTTP session"""
-        if self.session:
+        if self.session and self._owns_session:
             await self.session.close()
             logger.debug("LiveInformationTool session closed")
 
@@ -273,7 +329,8 @@ class KnowledgeBaseTool(BaseTool):
 class RaiseTicketTool(BaseTool):
     """Raise a support ticket in the system"""
     
-    def __init__(self, base_url: str = None, business_id: str = None, api_key: str = None):
+    def __init__(self, base_url: str = None, business_id: str = None, api_key: str = None,
+                 session: Optional[aiohttp.ClientSession] = None):
         super().__init__(
             "raise_ticket",
             "Create support ticket for non-urgent issues requiring investigation. Use for: problems needing research, warehouse/courier checks, complex issues that can wait. When issue cannot be resolved immediately but is not urgent."
@@ -281,7 +338,9 @@ class RaiseTicketTool(BaseTool):
         self.base_url = base_url
         self.business_id = business_id
         self.api_key = api_key
-        self.session = None
+        # Shared session from ToolManager when given; otherwise created lazily and owned here
+        self.session = session
+        self._owns_session = session is None
         
         logger.info("RaiseTicketTool initialized")
     
@@ -383,7 +442,7 @@ class RaiseTicketTool(BaseTool):
     
     async def close(self):
         """Close HTTP session"""
-        if self.session:
+        if self.session and self._owns_session:
             await self.session.close()
             logger.debug("RaiseTicketTool session closed")
 
@@ -391,14 +450,17 @@ class RaiseTicketTool(BaseTool):
 class AssignAgentTool(BaseTool):
     """Assign a human agent for follow-up"""
     
-    def __init__(self, agent_api_url: str = None, api_key: str = None):
+    def __init__(self, agent_api_url: str = None, api_key: str = None,
+                 session: Optional[aiohttp.ClientSession] = None):
         super().__init__(
             "assign_agent",
             "Escalate to human agent for immediate assistance. Use for: urgent/critical issues, very frustrated customers, complex problems you cannot resolve, or when customer explicitly requests human agent. Provides immediate human support."
         )
         self.agent_api_url = agent_api_url
         self.api_key = api_key
-        self.session = None
+        # Shared session from ToolManager when given; otherwise created lazily and owned here
+        self.session = session
+        self._owns_session = session is None
         
         logger.info("AssignAgentTool initialized")
     
@@ -506,7 +568,7 @@ class AssignAgentTool(BaseTool):
     
     async def close(self):
         """Close HTTP session"""
-        if self.session:
+        if self.session and self._owns_session:
             await self.session.close()
             logger.debug("AssignAgentTool session closed")
 
@@ -514,14 +576,17 @@ class AssignAgentTool(BaseTool):
 class OrderActionTool(BaseTool):
     """Execute order-related actions: refund, cancel, replace, return label"""
     
-    def __init__(self, api_base_url: str = None, api_key: str = None):
+    def __init__(self, api_base_url: str = None, api_key: str = None,
+                 session: Optional[aiohttp.ClientSession] = None):
         super().__init__(
             "order_action",
             "Execute order modifications: refund, cancel, replacement, return label, apply discount. IMPORTANT: For refunds/cancellations, use verification tool FIRST to check fraud risk. Available actions: refund, cancel, replace, return_label, apply_discount."
         )
         self.api_base_url = api_base_url
         self.api_key = api_key
-        self.session = None
+        # Shared session from ToolManager when given; otherwise created lazily and owned here
+        self.session = session
+        self._owns_session = session is None
         
         logger.info("OrderActionTool initialized")
     
@@ -684,7 +749,7 @@ class OrderActionTool(BaseTool):
     
     async def close(self):
         """Close HTTP session"""
-        if self.session:
+        if self.session and self._owns_session:
             await self.session.close()
             logger.debug("OrderActionTool session closed")
 
@@ -692,13 +757,16 @@ class OrderActionTool(BaseTool):
 class VerificationTool(BaseTool):
     """Customer verification: Fraud detection and risk assessment (NO OTP - not needed for CS workflows)"""
     
-    def __init__(self, fraud_api_key: str = None):
+    def __init__(self, fraud_api_key: str = None,
+                 session: Optional[aiohttp.ClientSession] = None):
         super().__init__(
             "verification",
             "Check fraud risk and verify legitimacy of refund/cancel requests. ALWAYS use BEFORE order_action when processing refunds or cancellations. Returns risk_level (low/medium/high). If risk is high, use assign_agent instead of order_action."
         )
         self.fraud_api_key = fraud_api_key
-        self.session = None
+        # Shared session from ToolManager when given; otherwise created lazily and owned here
+        self.session = session
+        self._owns_session = session is None
         
         logger.info("VerificationTool initialized")
     
@@ -770,7 +838,7 @@ class VerificationTool(BaseTool):
     
     async def close(self):
         """Close HTTP session"""
-        if self.session:
+        if self.session and self._owns_session:
             await self.session.close()
             logger.debug("VerificationTool session closed")
 
@@ -778,7 +846,8 @@ class VerificationTool(BaseTool):
 class ImageAnalysisTool(BaseTool):
     """Analyze product images for damage, defects, or verification using Vision LLM"""
     
-    def __init__(self, vision_api_key: str = None):
+    def __init__(self, vision_api_key: str = None,
+                 session: Optional[aiohttp.ClientSession] = None):
         super().__init__(
             "image_analysis",
             "Analyze product photos to verify damage, defects, or issues. Use for: broken items, defective products, wrong items delivered. Returns damage assessment and recommendation."
@@ -787,7 +856,9 @@ class ImageAnalysisTool(BaseTool):
         self.api_key = vision_api_key or os.getenv("OPENROUTER_API_KEY")
         self.vision_model = os.getenv("VISION_MODEL", "openai/gpt-4o")
         self.base_url = os.getenv("VISION_API_BASE_URL", "https://openrouter.ai/api/v1")
-        self.session = None
+        # Shared session from ToolManager when given; otherwise created lazily and owned here
+        self.session = session
+        self._owns_session = session is None
         
         logger.info(f"ImageAnalysisTool initialized with model: {self.vision_model}")
     
@@ -825,8 +896,7 @@ class ImageAnalysisTool(BaseTool):
         
         try:
             if not self.session:
-                timeout = aiohttp.ClientTimeout(total=60)
-                self.session = aiohttp.ClientSession(timeout=timeout)
+                self.session = aiohttp.ClientSession()
             
             # If we have URL, try to download and convert to base64
             if image_url and not image_base64:
@@ -878,7 +948,7 @@ class ImageAnalysisTool(BaseTool):
                     credentials = base64.b64encode(f"{twilio_sid}:{twilio_token}".encode()).decode()
                     headers["Authorization"] = f"Basic {credentials}"
             
-            async with self.session.get(image_url, headers=headers) as response:
+            async with self.session.get(image_url, headers=headers, timeout=VISION_TIMEOUT) as response:
                 if response.status != 200:
                     logger.error(f"Failed to download image: {response.status}")
                     return None
@@ -929,36 +999,13 @@ class ImageAnalysisTool(BaseTool):
         
         context = "\n".join(context_parts) if context_parts else "No additional context provided."
         
-        system_prompt = """You are a customer support image analyst. Analyze product images to assess damage, defects, or issues.
-
-Your job is to:
-1. Describe what you see in the image
-2. Identify any visible damage, defects, or quality issues
-3. Assess severity (none, minor, moderate, severe)
-4. Determine if the image supports the customer's claim
-5. Provide a recommendation for the support team
-
-IMPORTANT: Be objective and factual. Only report what you can actually see in the image."""
-
         user_prompt = f"""Analyze this product image for a customer support case.
 
 {context}
 
-Please provide your analysis in the following JSON format:
-{{
-    "damage_detected": true/false,
-    "damage_type": "physical_damage" | "defect" | "wrong_item" | "quality_issue" | "missing_parts" | "no_issue",
-    "severity": "none" | "minor" | "moderate" | "severe",
-    "description": "detailed description of what you see",
-    "matches_customer_claim": true/false/null (null if no claim provided),
-    "confidence": 0.0-1.0,
-    "recommendation": "approve_refund" | "approve_replacement" | "request_more_images" | "escalate_to_human" | "deny_claim",
-    "reasoning": "explanation for your recommendation"
-}}
-
-Respond ONLY with the JSON object, no other text."""
+{_VISION_JSON_FORMAT}"""
 
-        return system_prompt, user_prompt
+        return _VISION_SYSTEM_PROMPT, user_prompt
     
     def _detect_ai_generated(self, image_base64: str) -> Dict[str, Any]:
         """
@@ -1096,7 +1143,7 @@ Respond ONLY with the JSON object, no other text."""
         
         url = f"{self.base_url}/chat/completions"
         
-        async with self.session.post(url, headers=headers, json=payload) as response:
+        async with self.session.post(url, headers=headers, json=payload, timeout=VISION_TIMEOUT) as response:
             if response.status != 200:
                 error_text = await response.text()
                 logger.error(f"Vision API error: {response.status}: {error_text}")
@@ -1110,17 +1157,11 @@ Respond ONLY with the JSON object, no other text."""
     def _parse_vision_response(self, content: str) -> Dict[str, Any]:
         """Parse and validate vision model response"""
         try:
-            # Clean up markdown code blocks if present
-            content = content.strip()
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.startswith("```"):
-                content = content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
+            # Single scan for the JSON object; skips markdown fences and stray prose
+            match = _JSON_OBJECT.search(content)
+            content = match.group() if match else content.strip()
             
-            analysis = json.loads(content)
+            analysis = _json_loads(content)
             logger.info(f"Vision analysis complete: damage_detected={analysis.get('damage_detected')}, severity={analysis.get('severity')}")
             return analysis
             
@@ -1139,7 +1180,7 @@ Respond ONLY with the JSON object, no other text."""
     
     async def close(self):
         """Close HTTP session"""
-        if self.session:
+        if self.session and self._owns_session:
             await self.session.close()
             self.session = None
             logger.debug("ImageAnalysisTool session closed")
@@ -1148,9 +1189,13 @@ Respond ONLY with the JSON object, no other text."""
 class ToolManager:
     """Manages all customer support tools"""
     
-    def __init__(self, config: Dict[str, Any] = None):
+    def __init__(self, config: Dict[str, Any] = None, session: Optional[aiohttp.ClientSession] = None):
         self.config = config or {}
         self.tools: Dict[str, BaseTool] = {}
+        # One keep-alive pool for every tool instead of a session per tool; when none is
+        # passed in it is created on first use (sessions need a running event loop)
+        self._owns_session = session is None
+        self.session = session
         self._initialize_tools()
         
         logger.info("ToolManager initialized")
@@ -1162,7 +1207,8 @@ class ToolManager:
         live_info_config = self.config.get("live_information", {})
         self.tools["live_information"] = LiveInformationTool(
             api_base_url=live_info_config.get("api_url"),
-            api_key=live_info_config.get("api_key")
+            api_key=live_info_config.get("api_key"),
+            session=self.session
         )
         
         # Knowledge Base Tool
@@ -1176,33 +1222,38 @@ class ToolManager:
         self.tools["raise_ticket"] = RaiseTicketTool(
             base_url=ticket_config.get("base_url"),
             business_id=ticket_config.get("business_id"),
-            api_key=None  # No API key needed for this endpoint
+            api_key=None,  # No API key needed for this endpoint
+            session=self.session
         )
         
         # Assign Agent Tool
         agent_config = self.config.get("assign_agent", {})
         self.tools["assign_agent"] = AssignAgentTool(
             agent_api_url=agent_config.get("api_url"),
-            api_key=agent_config.get("api_key")
+            api_key=agent_config.get("api_key"),
+            session=self.session
         )
         
         # Order Action Tool (NEW)
         order_action_config = self.config.get("order_action", {})
         self.tools["order_action"] = OrderActionTool(
             api_base_url=order_action_config.get("api_url"),
-            api_key=order_action_config.get("api_key")
+            api_key=order_action_config.get("api_key"),
+            session=self.session
         )
         
         # Verification Tool
         verification_config = self.config.get("verification", {})
         self.tools["verification"] = VerificationTool(
-            fraud_api_key=verification_config.get("fraud_api_key")
+            fraud_api_key=verification_config.get("fraud_api_key"),
+            session=self.session
         )
         
         # Image Analysis Tool
         image_config = self.config.get("image_analysis", {})
         self.tools["image_analysis"] = ImageAnalysisTool(
-            vision_api_key=image_config.get("vision_api_key")
+            vision_api_key=image_config.get("vision_api_key"),
+            session=self.session
         )
         
         logger.info(f"✅ Initialized {len(self.tools)} tools: {list(self.tools.keys())}")
@@ -1236,6 +1287,7 @@ class ToolManager:
         
         try:
             logger.info(f"🔧 Executing tool: {tool_name}")
+            await self._get_session()
             result = await tool.execute(**kwargs)
             result["tool_name"] = tool_name
             
@@ -1254,6 +1306,18 @@ class ToolManager:
                 "tool_name": tool_name
             }
     
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Create the shared tool session on first use and hand it to tools without one"""
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=50, keepalive_timeout=60, ttl_dns_cache=300)
+            )
+            for tool in self.tools.values():
+                if getattr(tool, "_owns_session", False) and tool.session is None:
+                    tool.session = self.session
+                    tool._owns_session = False
+        return self.session
+    
     def get_tool_stats(self) -> Dict[str, Any]:
         """Get usage statistics for all tools"""
         return {
@@ -1265,12 +1329,20 @@ class ToolManager:
         """Cleanup tool resources"""
         logger.info("🧹 Cleaning up tools...")
         
-        for name, tool in self.tools.items():
-            if hasattr(tool, 'close'):
-                try:
-                    await tool.close()
-                    logger.debug(f"   ✅ Closed {name}")
-                except Exception as e:
-                    logger.warning(f"   ⚠️ Error closing {name}: {str(e)}")
+        async with asyncio.TaskGroup() as tg:
+            for name, tool in self.tools.items():
+                if hasattr(tool, 'close'):
+                    tg.create_task(self._close_tool(name, tool))
+        
+        if self._owns_session and self.session and not self.session.closed:
+            await self.session.close()
         
-        logger.info("✅ Tool cleanup complete")
\ No newline at end of file
+        logger.info("✅ Tool cleanup complete")
+    
+    async def _close_tool(self, name: str, tool: BaseTool) -> None:
+        """Close one tool, logging failures so the other tools still close"""
+        try:
+            await tool.close()
+            logger.debug(f"   ✅ Closed {name}")
+        except Exception as e:
+            logger.warning(f"   ⚠️ Error closing {name}: {str(e)}")
\ No newline at end of file
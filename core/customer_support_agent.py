@@ -17,16 +17,333 @@ AVAILABLE TOOLS:
 """
 
 import json
+import hashlib
 import logging
 import asyncio
-from typing import Dict, List, Any, Optional
-from datetime import datetime
+import os
+import re
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
+from datetime import datetime, date
 from dotenv import load_dotenv
 load_dotenv()
 from .config import AddBackgroundTask
+from .llm_client import remove_double_quotes
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# Max generated responses kept for exact-prompt reuse (0 disables the cache)
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+MAX_CONCURRENT_TOOLS = int(os.getenv("MAX_CONCURRENT_TOOLS", "5"))
+# Prompt history: last N messages, then trimmed oldest-first to a token budget (~4 chars/token)
+HISTORY_MAX_MESSAGES = 10
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))
+HISTORY_SUMMARY_MAX_CHARS = int(os.getenv("HISTORY_SUMMARY_MAX_CHARS", "800"))
+_SUMMARY_LINE_CHARS = 120
+_SUMMARY_PREFIX = "SUMMARY OF EARLIER CONVERSATION: "
+# Size caps for tool output placed in the response prompt and logs
+TOOL_RESULT_MAX_CHARS = int(os.getenv("TOOL_RESULT_MAX_CHARS", "4000"))
+TOOL_FIELD_MAX_CHARS = 500
+
+
+def _json_loads(data: str) -> Any:
+    """Parse JSON with orjson when available (raises json.JSONDecodeError either way)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _truncate(text: Any, limit: int) -> str:
+    """Keep the head and tail of oversized text with a marker for what was cut"""
+    text = str(text)
+    if len(text) <= limit:
+        return text
+    half = limit // 2
+    return f"{text[:half]}\n…[truncated {len(text) - limit} chars]…\n{text[-half:]}"
+
+
+def _summarize_history(messages: List[Dict]) -> str:
+    """Condense older turns to the first line of each message - no LLM call"""
+    lines = []
+    for msg in messages:
+        content = str(msg.get('content', '')).strip()
+        if not content:
+            continue
+        first_line = content.splitlines()[0]
+        if len(first_line) > _SUMMARY_LINE_CHARS:
+            first_line = first_line[:_SUMMARY_LINE_CHARS].rstrip() + "…"
+        lines.append(f"{msg.get('role', 'unknown')}: {first_line}")
+    summary = " | ".join(lines)
+    # The most recent of the older turns matter most - cut from the front
+    if len(summary) > HISTORY_SUMMARY_MAX_CHARS:
+        summary = "…" + summary[-HISTORY_SUMMARY_MAX_CHARS:]
+    return summary
+
+
+def _format_history(chat_history: Optional[List[Dict]]) -> str:
+    """Render recent chat history as ROLE: content lines within the token budget"""
+    if not chat_history:
+        return ""
+    recent = chat_history[-HISTORY_MAX_MESSAGES:]
+    entries = [
+        f"{msg.get('role', 'unknown').upper()}: {msg.get('content', '')}"
+        for msg in recent
+    ]
+    budget_chars = HISTORY_TOKEN_BUDGET * 4
+    older = len(chat_history) - len(recent)
+    summary_reserve = len(_SUMMARY_PREFIX) + HISTORY_SUMMARY_MAX_CHARS + 2
+    total = sum(len(entry) + 1 for entry in entries)
+    start = 0
+    # Replace oldest messages with the summary first, but always keep the latest exchange
+    while total + (summary_reserve if older + start else 0) > budget_chars and len(entries) - start > 2:
+        total -= len(entries[start]) + 1
+        start += 1
+    entries = entries[start:]
+    # Turns outside the verbatim window or pushed out by the budget are kept only as a short summary
+    summarized = chat_history[:older + start]
+    summary = _summarize_history(summarized) if summarized else ""
+    if summary:
+        entries.insert(0, f"{_SUMMARY_PREFIX}{summary}")
+        total += len(entries[0]) + 1
+    if total > budget_chars:
+        # Nothing left to drop - cap each remaining entry at its share of the budget
+        share = budget_chars // len(entries) - 1
+        entries = [_truncate(entry, max(share - 40, 2)) if len(entry) > share else entry
+                   for entry in entries]
+    return "\n".join(entries)
+
+
+# Characters that matter when locating a JSON object; everything else is skipped in C
+_JSON_SCAN = re.compile(r'[{}"\\]')
+
+
+def _find_json_span(buf: str) -> Optional[Tuple[int, int]]:
+    """(start, end) of the first balanced top-level {...} in buf, ignoring braces inside strings"""
+    start = buf.find('{')
+    if start == -1:
+        return None
+    
+    depth = 0
+    in_string = False
+    escaped_pos = -1
+    for match in _JSON_SCAN.finditer(buf, start):
+        pos = match.start()
+        if pos == escaped_pos:
+            continue
+        ch = buf[pos]
+        if in_string:
+            if ch == '\\':
+                escaped_pos = pos + 1
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                return start, pos + 1
+    return None
+
+
+_DATE_CACHE: Dict[str, Any] = {"day": None, "text": ""}
+
+
+def _today() -> str:
+    """Today's date for prompts, formatted once per day (keeps the prompt prefix stable)"""
+    today = date.today()
+    if _DATE_CACHE["day"] != today:
+        _DATE_CACHE.update(day=today, text=today.strftime("%B %d, %Y"))
+    return _DATE_CACHE["text"]
+
+
+# Prompt guidance per tool; only tools the ToolManager actually provides are rendered
+_TOOLS_INFO = {
+    "live_information": {
+        "purpose": "Get real-time order and customer information",
+        "use_when": "Customer asks about order status, tracking, delivery, order history",
+        "examples": "Where is my order?, Track order #12345, What's my order status?"
+    },
+    "knowledge_base": {
+        "purpose": "Search company policies, FAQs, product guides",
+        "use_when": "Customer asks about policies, returns, shipping info, product questions",
+        "examples": "What's your return policy?, How do I return an item?, Shipping times?"
+    },
+    "verification": {
+        "purpose": "Fraud check and risk assessment for sensitive operations",
+        "use_when": "Before processing refunds, cancellations, or account changes",
+        "returns": "risk_level (low/medium/high) - if high, escalate to human"
+    },
+    "image_analysis": {
+        "purpose": "Analyze product photos for damage, defects, or issues",
+        "use_when": "Customer reports broken/defective item AND has shared a photo",
+        "returns": "damage assessment, severity, recommendation"
+    },
+    "order_action": {
+        "purpose": "DO NOT USE - Bot cannot process refunds/cancels/replacements",
+        "use_when": "NEVER - these actions require human agent approval",
+        "important": "Always escalate to assign_agent for refund/cancel/replace requests"
+    },
+    "assign_agent": {
+        "purpose": "Connect customer with a human agent who can process refunds, replacements, etc.",
+        "use_when": "After gathering all info (order ID, reason, photos if applicable) for: refund requests, cancellations, replacements, complex issues",
+        "important": "NEVER use just because user says 'talk to agent' - first ask what their issue is. Gather all info before escalating."
+    },
+    "raise_ticket": {
+        "purpose": "Create support ticket for investigation",
+        "use_when": "Issue needs research (warehouse/courier checks) but is not urgent"
+    }
+}
+
+# System prompts for the two LLM calls
+_ANALYSIS_ROLE = "You analyze customer support queries intelligently. Return valid JSON only, no other text."
+
+# Static response guidelines; kept in the system prompt so every response call shares the same prefix
+_RESPONSE_SYSTEM_PROMPT = """You are a friendly, helpful and empathetic customer support agent. Respond naturally and helpfully.
+
+=== RESPONSE GUIDELINES ===
+
+1. LANGUAGE MIRRORING:
+   You MUST mirror both the customer's language AND their writing style exactly.
+   If the customer uses romanized or mixed script, respond the same way.
+
+2. DE-ESCALATION (if "Needs de-escalation" is True):
+   Start with empathy, following the DE-ESCALATION APPROACH given with the request.
+
+3. MISSING INFORMATION (if "Needs more info" is True):
+   - Acknowledge their request warmly
+   - Ask specifically for the INFORMATION STILL NEEDED FROM CUSTOMER
+   - Explain what you'll do once you have it
+
+4. USING TOOL RESULTS:
+   - If verification done → mention you've verified their request
+   - If image analyzed → reference what was found
+   - If agent assigned → confirm help is on the way with ETA
+   - If ticket created → give them the ticket number and timeline
+   - If order/policy info retrieved → answer their question directly
+
+5. HANDLE TOOL ERRORS:
+   - If any tool shows "Error" or failed → acknowledge the issue
+   - For image_analysis error → politely ask customer to share the image again (it may not have uploaded properly)
+   - Don't pretend the tool worked if it failed
+   - IMPORTANT: If image_analysis failed, focus ONLY on getting a proper image. Do NOT offer agent connection yet.
+     Wait until image is successfully analyzed before offering to connect with an agent.
+
+6. OFFERING ESCALATION (only if needs_more_info = False AND you have all the info):
+   When ready to escalate, give two options:
+   - Option 1: Connect with agent (for refunds, replacements, complex issues)
+   - Option 2: Just sharing feedback (no agent needed, thank them)
+   Example: "Would you like me to connect you with an agent to help with this, or were you just sharing feedback?"
+   
+   IMPORTANT: If needs_more_info = True, do NOT offer escalation yet. Just ask for the missing info.
+
+7. BOT LIMITATIONS:
+   - Bot CANNOT process refunds, cancellations, or replacements directly
+   - For these requests: gather info → verify → then offer to connect with agent
+   - Never say "I'll process the refund" - say "I can connect you with an agent who can help with your refund"
+
+8. FORMAT:
+   - Keep responses extremely short: 1 sentence for most answers within 10-20 wods. Only 2 sentences if absolutely necessary. Be direct and helpful.
+   - Be warm but professional
+   - End with a helpful next step or question if appropriate
+   - Do NOT make up information that wasn't in the tool results
+   - Do NOT claim you did something if no tools were executed
+"""
+
+# Static part of the analysis prompt; rendered once per agent with its tool descriptions
+_ANALYSIS_GUIDANCE = """=== WORKFLOW GUIDANCE ===
+
+Think through these steps naturally:
+
+1. UNDERSTAND THE CUSTOMER
+   - What language and writing style are they using?
+     (Detect whether the customer is using native script or romanized writing.
+     You must respond in the same language and writing style.)
+   - How are they feeling? (angry, frustrated, confused, calm, satisfied)
+   - How urgent is their issue?
+   - If very angry/frustrated with high intensity → they need de-escalation (empathy first)
+
+2. IDENTIFY THEIR NEED
+   - What do they actually want? (refund, order status, information, help with issue, etc.)
+   - Is this a follow-up to previous conversation? Check history for context.
+
+3. DO YOU NEED MORE INFORMATION?
+   Consider if you're missing critical info to help them:
+   - For refund/cancellation → Do you have the order ID? What's the reason?
+   - For damaged item → Do you have a photo? Do you know what happened?
+   - For wrong item → Do you have a photo? What did they receive vs expect?
+   - For expired/spoiled product → Ask for photo showing expiry date or product condition
+   - For "I want to talk to agent" with NO context → Ask what issue they're facing first!
+   
+   IMPORTANT: If user just says "I want agent" or "talk to human" but hasn't explained their problem:
+   → Set needs_more_info=true, missing_info="what issue they need help with"
+   → Do NOT assign agent yet - we need to understand and try to help first
+   
+   If missing essential info → set needs_more_info=true and specify what's missing
+
+4. SELECT TOOLS (only if you have enough info)
+   - Order status/tracking questions → live_information
+   - Policy/FAQ questions → knowledge_base  
+   - Refund/cancel/replace requests → verification first, then assign_agent (bot CANNOT process these, agent must)
+   - Damaged product with photo → image_analysis + verification, then OFFER agent in response (don't auto-assign)
+   - Non-urgent issue needing research → raise_ticket
+
+5. SPECIAL CASES
+   - Customer asks for human BUT has already explained issue and we couldn't help → assign_agent
+   - Customer asks for human WITHOUT explaining issue → Ask what's wrong first (needs_more_info=true)
+   - High-risk verification result → assign_agent
+   - Simple greeting or thanks → no tools needed
+
+=== TOOL SELECTION RULES ===
+
+Some tools are "information-gathering" and can run together:
+   - live_information, knowledge_base, verification, image_analysis
+
+Some tools are "commitment actions" - only use when you have enough verified info:
+   - assign_agent → commits a human agent's time
+   - order_action → commits to refund/cancel/replace
+   - raise_ticket → creates a permanent record
+
+IMPORTANT FOR DAMAGE CLAIMS:
+   - When customer provides photo for damage → Use [image_analysis, verification] ONLY
+   - Do NOT include assign_agent in the same turn
+   - Wait for image analysis result, then in the NEXT turn:
+     • If damage confirmed → Offer to connect with agent (response asks "would you like me to connect you with an agent?")
+     • If image error/failed → Ask for clearer photo (no agent needed yet)
+     • If no damage found → Tell user, offer escalation if they insist
+   - Only use assign_agent when:
+     • Customer confirms they want agent AFTER we offered (based on verified issue)
+     • Customer already explained issue in previous turns AND we couldn't resolve it AND they ask for human
+   - Do NOT use assign_agent just because user says "talk to agent" without explaining their problem first
+
+Return your analysis as JSON:
+
+{
+  "language": "detected language",
+  "writing_style": "native script or romanized (based on how the customer writes)",
+  "intent": "brief description of what customer wants",
+  "sentiment": {
+    "emotion": "angry|frustrated|confused|neutral|satisfied|urgent",
+    "intensity": "low|medium|high",
+    "urgency": "low|medium|high|critical"
+  },
+  "needs_de_escalation": true or false,
+  "de_escalation_approach": "how to acknowledge their feelings if needed, or empty string",
+  "needs_more_info": true or false,
+  "missing_info": "what specific info is needed (order_id, photo, reason, details) or null if none",
+  "tools_to_use": ["tool1", "tool2"] or empty array if no tools needed,
+  "tool_queries": {
+    "tool_name": "specific query to pass to this tool"
+  },
+  "reasoning": "brief explanation of your decision"
+}"""
+
 
 
 class CustomerSupportAgent:
@@ -37,54 +354,26 @@ class CustomerSupportAgent:
         self.heart_llm = heart_llm  # For response generation
         self.tool_manager = tool_manager
         self.available_tools = tool_manager.get_available_tools()
+        self._available_tool_set = frozenset(self.available_tools)
         self.tool_descriptions = self._get_tool_descriptions()
+        # Static instructions live in the system prompt so every call shares a cacheable prefix
+        self._analysis_system_prompt = (
+            f"{_ANALYSIS_ROLE}\n\n"
+            f"AVAILABLE TOOLS:\n{self.tool_descriptions}\n\n{_ANALYSIS_GUIDANCE}"
+        )
+        self._tool_semaphore = asyncio.Semaphore(max(1, MAX_CONCURRENT_TOOLS))
+        self._inflight: Dict[str, asyncio.Task] = {}
         self.task_queue: asyncio.Queue["AddBackgroundTask"] = asyncio.Queue()
         self._worker_started = False
+        self._response_cache: "OrderedDict[str, str]" = OrderedDict()
         
         logger.info(f"CustomerSupportAgent initialized with tools: {self.available_tools}")
     
     def _get_tool_descriptions(self) -> str:
         """Get formatted tool descriptions for LLM prompts"""
-        tools_info = {
-            "live_information": {
-                "purpose": "Get real-time order and customer information",
-                "use_when": "Customer asks about order status, tracking, delivery, order history",
-                "examples": "Where is my order?, Track order #12345, What's my order status?"
-            },
-            "knowledge_base": {
-                "purpose": "Search company policies, FAQs, product guides",
-                "use_when": "Customer asks about policies, returns, shipping info, product questions",
-                "examples": "What's your return policy?, How do I return an item?, Shipping times?"
-            },
-            "verification": {
-                "purpose": "Fraud check and risk assessment for sensitive operations",
-                "use_when": "Before processing refunds, cancellations, or account changes",
-                "returns": "risk_level (low/medium/high) - if high, escalate to human"
-            },
-            "image_analysis": {
-                "purpose": "Analyze product photos for damage, defects, or issues",
-                "use_when": "Customer reports broken/defective item AND has shared a photo",
-                "returns": "damage assessment, severity, recommendation"
-            },
-            "order_action": {
-                "purpose": "DO NOT USE - Bot cannot process refunds/cancels/replacements",
-                "use_when": "NEVER - these actions require human agent approval",
-                "important": "Always escalate to assign_agent for refund/cancel/replace requests"
-            },
-            "assign_agent": {
-                "purpose": "Connect customer with a human agent who can process refunds, replacements, etc.",
-                "use_when": "After gathering all info (order ID, reason, photos if applicable) for: refund requests, cancellations, replacements, complex issues",
-                "important": "NEVER use just because user says 'talk to agent' - first ask what their issue is. Gather all info before escalating."
-            },
-            "raise_ticket": {
-                "purpose": "Create support ticket for investigation",
-                "use_when": "Issue needs research (warehouse/courier checks) but is not urgent"
-            }
-        }
-        
         formatted = []
-        for name, info in tools_info.items():
-            if name in self.available_tools:
+        for name, info in _TOOLS_INFO.items():
+            if name in self._available_tool_set:
                 formatted.append(f"• {name}:")
                 formatted.append(f"  Purpose: {info['purpose']}")
                 formatted.append(f"  Use when: {info['use_when']}")
@@ -98,6 +387,30 @@ class CustomerSupportAgent:
         return "\n".join(formatted)
     
     async def process_query(self, query: str, chat_history: List[Dict] = None, user_id: str = None) -> Dict[str, Any]:
+        """Process customer query; identical requests already in flight share a single run"""
+        key = self._inflight_key(query, chat_history, user_id)
+        task = self._inflight.get(key)
+        if task is not None:
+            logger.info(f"🔁 Identical query already in flight - sharing its result: '{query[:50]}'")
+        else:
+            task = asyncio.create_task(self._process_query(query, chat_history, user_id))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget_inflight(key, done))
+        # Every caller (the first included) waits through a shield, so one cancelled caller
+        # (e.g. a client disconnect) cannot abort the shared run for the others
+        return await asyncio.shield(task)
+    
+    def _forget_inflight(self, key: str, task: asyncio.Task):
+        """Drop a finished run from the in-flight table"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+    
+    def _inflight_key(self, query: str, chat_history: Optional[List[Dict]], user_id: Optional[str]) -> str:
+        """Identity of a request for in-flight de-duplication"""
+        payload = json.dumps([user_id, query, chat_history or []], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    async def _process_query(self, query: str, chat_history: List[Dict] = None, user_id: str = None) -> Dict[str, Any]:
         """Process customer query with minimal LLM calls"""
         self._start_worker_if_needed()
         logger.info(f"🔵 PROCESSING QUERY: '{query}'")
@@ -109,16 +422,7 @@ class CustomerSupportAgent:
             analysis = await self._analyze_query(query, chat_history)
             analysis_time = (datetime.now() - analysis_start).total_seconds()
             
-            # Log analysis details
-            logger.info(f"📊 ANALYSIS RESULTS:")
-            logger.info(f"   Language: {analysis.get('language', 'en')}")
-            logger.info(f"   Intent: {analysis.get('intent', 'Unknown')}")
-            logger.info(f"   Sentiment: {analysis.get('sentiment', {})}")
-            logger.info(f"   Needs De-escalation: {analysis.get('needs_de_escalation', False)}")
-            logger.info(f"   Needs More Info: {analysis.get('needs_more_info', False)}")
-            logger.info(f"   Missing Info: {analysis.get('missing_info', 'none')}")
-            logger.info(f"   Tools Selected: {analysis.get('tools_to_use', [])}")
-            logger.info(f"   Reasoning: {analysis.get('reasoning', 'N/A')}")
+            self._log_analysis(analysis)
             
             # Step 2: Execute tools if needed
             tools_to_use = analysis.get('tools_to_use', [])
@@ -162,19 +466,51 @@ class CustomerSupportAgent:
                 "response": "I apologize, but I encountered an error. Please try again."
             }
     
+    async def process_query_stream(self, query: str, chat_history: List[Dict] = None,
+                                   user_id: str = None) -> AsyncIterator[Dict[str, str]]:
+        """Process customer query, yielding delta events as the response is generated.
+        
+        Events are {"type": "delta", "text"}, then either {"type": "done", "response"} carrying
+        the cleaned reply (same text /chat returns) or {"type": "error", "error"}.
+        """
+        self._start_worker_if_needed()
+        logger.info(f"🔵 PROCESSING QUERY (streaming): '{query}'")
+        
+        try:
+            analysis = await self._analyze_query(query, chat_history)
+            self._log_analysis(analysis)
+            
+            if analysis.get('needs_more_info', False):
+                logger.info("❓ Need more info - skipping tools")
+                tool_results = {}
+            else:
+                tool_results = await self._execute_tools(analysis.get('tools_to_use', []), query, analysis, user_id)
+        except Exception as e:
+            logger.error(f"❌ Processing failed: {str(e)}")
+            yield {"type": "error", "error": "I apologize, but I encountered an error. Please try again."}
+            return
+        
+        async for event in self._stream_response(query, analysis, tool_results, chat_history):
+            yield event
+    
+    def _log_analysis(self, analysis: Dict[str, Any]):
+        """Log analysis details"""
+        logger.info(f"📊 ANALYSIS RESULTS:")
+        logger.info(f"   Language: {analysis.get('language', 'en')}")
+        logger.info(f"   Intent: {analysis.get('intent', 'Unknown')}")
+        logger.info(f"   Sentiment: {analysis.get('sentiment', {})}")
+        logger.info(f"   Needs De-escalation: {analysis.get('needs_de_escalation', False)}")
+        logger.info(f"   Needs More Info: {analysis.get('needs_more_info', False)}")
+        logger.info(f"   Missing Info: {analysis.get('missing_info', 'none')}")
+        logger.info(f"   Tools Selected: {analysis.get('tools_to_use', [])}")
+        logger.info(f"   Reasoning: {analysis.get('reasoning', 'N/A')}")
+    
     async def _analyze_query(self, query: str, chat_history: List[Dict] = None) -> Dict[str, Any]:
         """Analyze customer query using LLM intelligence"""
-        current_date = datetime.now().strftime("%B %d, %Y")
+        current_date = _today()
         
         # Format chat history for embedding in prompt
-        formatted_history = ""
-        if chat_history:
-            history_entries = []
-            for msg in chat_history[-10:]:  # Last 10 messages for context
-                role = msg.get('role', 'unknown').upper()
-                content = msg.get('content', '')
-                history_entries.append(f"{role}: {content}")
-            formatted_history = "\n".join(history_entries)
+        formatted_history = _format_history(chat_history)
         
         analysis_prompt = f"""You are analyzing a customer support query. Understand what the customer needs and decide how to help them.
 
@@ -185,106 +521,18 @@ CUSTOMER QUERY: {query}
 CONVERSATION HISTORY (for context - check previous turns to understand follow-ups):
 {formatted_history if formatted_history else 'No previous conversation.'}
 
-AVAILABLE TOOLS:
-{self.tool_descriptions}
-
-=== WORKFLOW GUIDANCE ===
-
-Think through these steps naturally:
-
-1. UNDERSTAND THE CUSTOMER
-   - What language and writing style are they using?
-     (Detect whether the customer is using native script or romanized writing.
-     You must respond in the same language and writing style.)
-   - How are they feeling? (angry, frustrated, confused, calm, satisfied)
-   - How urgent is their issue?
-   - If very angry/frustrated with high intensity → they need de-escalation (empathy first)
-
-2. IDENTIFY THEIR NEED
-   - What do they actually want? (refund, order status, information, help with issue, etc.)
-   - Is this a follow-up to previous conversation? Check history for context.
-
-3. DO YOU NEED MORE INFORMATION?
-   Consider if you're missing critical info to help them:
-   - For refund/cancellation → Do you have the order ID? What's the reason?
-   - For damaged item → Do you have a photo? Do you know what happened?
-   - For wrong item → Do you have a photo? What did they receive vs expect?
-   - For expired/spoiled product → Ask for photo showing expiry date or product condition
-   - For "I want to talk to agent" with NO context → Ask what issue they're facing first!
-   
-   IMPORTANT: If user just says "I want agent" or "talk to human" but hasn't explained their problem:
-   → Set needs_more_info=true, missing_info="what issue they need help with"
-   → Do NOT assign agent yet - we need to understand and try to help first
-   
-   If missing essential info → set needs_more_info=true and specify what's missing
-
-4. SELECT TOOLS (only if you have enough info)
-   - Order status/tracking questions → live_information
-   - Policy/FAQ questions → knowledge_base  
-   - Refund/cancel/replace requests → verification first, then assign_agent (bot CANNOT process these, agent must)
-   - Damaged product with photo → image_analysis + verification, then OFFER agent in response (don't auto-assign)
-   - Non-urgent issue needing research → raise_ticket
-
-5. SPECIAL CASES
-   - Customer asks for human BUT has already explained issue and we couldn't help → assign_agent
-   - Customer asks for human WITHOUT explaining issue → Ask what's wrong first (needs_more_info=true)
-   - High-risk verification result → assign_agent
-   - Simple greeting or thanks → no tools needed
-
-=== TOOL SELECTION RULES ===
-
-Some tools are "information-gathering" and can run together:
-   - live_information, knowledge_base, verification, image_analysis
-
-Some tools are "commitment actions" - only use when you have enough verified info:
-   - assign_agent → commits a human agent's time
-   - order_action → commits to refund/cancel/replace
-   - raise_ticket → creates a permanent record
-
-IMPORTANT FOR DAMAGE CLAIMS:
-   - When customer provides photo for damage → Use [image_analysis, verification] ONLY
-   - Do NOT include assign_agent in the same turn
-   - Wait for image analysis result, then in the NEXT turn:
-     • If damage confirmed → Offer to connect with agent (response asks "would you like me to connect you with an agent?")
-     • If image error/failed → Ask for clearer photo (no agent needed yet)
-     • If no damage found → Tell user, offer escalation if they insist
-   - Only use assign_agent when:
-     • Customer confirms they want agent AFTER we offered (based on verified issue)
-     • Customer already explained issue in previous turns AND we couldn't resolve it AND they ask for human
-   - Do NOT use assign_agent just because user says "talk to agent" without explaining their problem first
-
-Return your analysis as JSON:
-
-{{
-  "language": "detected language",
-  "writing_style": "native script or romanized (based on how the customer writes)",
-  "intent": "brief description of what customer wants",
-  "sentiment": {{
-    "emotion": "angry|frustrated|confused|neutral|satisfied|urgent",
-    "intensity": "low|medium|high",
-    "urgency": "low|medium|high|critical"
-  }},
-  "needs_de_escalation": true or false,
-  "de_escalation_approach": "how to acknowledge their feelings if needed, or empty string",
-  "needs_more_info": true or false,
-  "missing_info": "what specific info is needed (order_id, photo, reason, details) or null if none",
-  "tools_to_use": ["tool1", "tool2"] or empty array if no tools needed,
-  "tool_queries": {{
-    "tool_name": "specific query to pass to this tool"
-  }},
-  "reasoning": "brief explanation of your decision"
-}}"""
+Follow the workflow guidance and JSON format from your instructions."""
 
         try:
             response = await self.brain_llm.generate(
                 messages=[{"role": "user", "content": analysis_prompt}],
-                system_prompt="You analyze customer support queries intelligently. Return valid JSON only, no other text.",
+                system_prompt=self._analysis_system_prompt,
                 temperature=0.1,
                 max_tokens=1500
             )
             
             json_str = self._extract_json(response)
-            result = json.loads(json_str)
+            result = _json_loads(json_str)
             
             logger.info(f"✅ Analysis complete: {result.get('intent', 'Unknown intent')}")
             return result
@@ -316,9 +564,10 @@ Return your analysis as JSON:
         results = {}
         tasks = []
         tool_queries = analysis.get('tool_queries', {})
+        available = self._available_tool_set
         
         for i, tool in enumerate(tools):
-            if tool not in self.available_tools:
+            if tool not in available:
                 logger.warning(f"⚠️ Tool '{tool}' not available, skipping")
                 continue
             
@@ -326,33 +575,94 @@ Return your analysis as JSON:
             tool_query = tool_queries.get(tool, query)
             
             logger.info(f"🔧 Queueing {tool}: '{tool_query[:50]}...'")
-            task = self.tool_manager.execute_tool(tool, query=tool_query, user_id=user_id)
+            task = self._run_tool(tool, query=tool_query, user_id=user_id)
             tasks.append((tool_key, task))
         
         # Execute all in parallel
-        for tool_key, task in tasks:
-            try:
-                results[tool_key] = await task
+        outcomes = await asyncio.gather(*(task for _, task in tasks), return_exceptions=True)
+        for (tool_key, _), outcome in zip(tasks, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"❌ {tool_key} failed: {outcome}")
+                results[tool_key] = {"error": str(outcome), "success": False}
+            else:
+                results[tool_key] = outcome
                 logger.info(f"✅ {tool_key} complete")
-            except Exception as e:
-                logger.error(f"❌ {tool_key} failed: {e}")
-                results[tool_key] = {"error": str(e), "success": False}
         
         return results
     
+    async def _run_tool(self, tool: str, **kwargs) -> Dict[str, Any]:
+        """Execute one tool, bounded by the shared tool concurrency limit"""
+        async with self._tool_semaphore:
+            return await self.tool_manager.execute_tool(tool, **kwargs)
+    
     async def _generate_response(self, query: str, analysis: Dict, tool_results: Dict, 
                                  chat_history: List[Dict]) -> str:
         """Generate customer support response"""
+        response_prompt = self._build_response_prompt(query, analysis, tool_results, chat_history)
+        
+        # Identical prompt (query, history, analysis, tool data) -> reuse the earlier reply
+        cache_key = self._response_cache_key(response_prompt)
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            self._response_cache.move_to_end(cache_key)
+            logger.info("💾 Response cache hit - skipping response LLM call")
+            return cached
+        
+        return await self._complete_response(response_prompt, cache_key)
+    
+    async def _stream_response(self, query: str, analysis: Dict, tool_results: Dict,
+                               chat_history: List[Dict]) -> AsyncIterator[Dict[str, str]]:
+        """Stream the customer support response, falling back to a single reply if streaming fails"""
+        response_prompt = self._build_response_prompt(query, analysis, tool_results, chat_history)
+        
+        cache_key = self._response_cache_key(response_prompt)
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            self._response_cache.move_to_end(cache_key)
+            logger.info("💾 Response cache hit - skipping response LLM call")
+            yield {"type": "delta", "text": cached}
+            yield {"type": "done", "response": cached}
+            return
+        
+        chunks = []
+        try:
+            async for delta in self.heart_llm.generate_stream(
+                messages=[{"role": "user", "content": response_prompt}],
+                system_prompt=_RESPONSE_SYSTEM_PROMPT,
+                temperature=0.4,
+                max_tokens=400
+            ):
+                chunks.append(delta)
+                yield {"type": "delta", "text": delta}
+        except Exception as e:
+            if chunks:
+                logger.error(f"❌ Response stream interrupted: {e}")
+                yield {"type": "error", "error": "The response was interrupted. Please try again."}
+                return
+            logger.warning(f"⚠️ Streaming unavailable ({e}) - generating the full response instead")
+            response = await self._complete_response(response_prompt, cache_key)
+            yield {"type": "delta", "text": response}
+            yield {"type": "done", "response": response}
+            return
+        
+        # Same post-processing as the non-streaming path; raw deltas may still carry quotes or fences
+        response = self._clean_response(remove_double_quotes("".join(chunks)))
+        if not response:
+            logger.warning("⚠️ Stream returned no content - generating the full response instead")
+            response = await self._complete_response(response_prompt, cache_key)
+            yield {"type": "delta", "text": response}
+            yield {"type": "done", "response": response}
+            return
+        logger.info(f"💬 RESPONSE STREAMED ({len(response)} chars): {response}")
+        self._cache_response(cache_key, response)
+        yield {"type": "done", "response": response}
+    
+    def _build_response_prompt(self, query: str, analysis: Dict, tool_results: Dict,
+                               chat_history: List[Dict]) -> str:
+        """Render the response-generation prompt"""
         
         # Format chat history
-        formatted_history = ""
-        if chat_history:
-            history_entries = []
-            for msg in chat_history[-10:]:
-                role = msg.get('role', 'unknown').upper()
-                content = msg.get('content', '')
-                history_entries.append(f"{role}: {content}")
-            formatted_history = "\n".join(history_entries)
+        formatted_history = _format_history(chat_history)
         
         # Format tool results
         tool_data = self._format_tool_results(tool_results)
@@ -360,7 +670,7 @@ Return your analysis as JSON:
         logger.info("="*60)
         logger.info("🔧 TOOL RESULTS FOR RESPONSE:")
         logger.info("="*60)
-        logger.info(tool_data)
+        logger.info(_truncate(tool_data, TOOL_RESULT_MAX_CHARS))
         logger.info("="*60)
         
         # Extract analysis data
@@ -371,7 +681,7 @@ Return your analysis as JSON:
         needs_more_info = analysis.get('needs_more_info', False)
         missing_info = analysis.get('missing_info')
         
-        response_prompt = f"""You are a friendly, helpful customer support agent. Generate a response to help this customer.
+        response_prompt = f"""Generate a response to help this customer.
 
 CUSTOMER QUERY: {query}
 
@@ -387,66 +697,27 @@ CUSTOMER STATE:
 - Intensity: {sentiment.get('intensity', 'medium')}
 - Urgency: {sentiment.get('urgency', 'medium')}
 - Needs de-escalation: {needs_de_escalation}
+- Needs more info: {needs_more_info}
+
+DE-ESCALATION APPROACH: {de_escalation_approach if de_escalation_approach else 'Acknowledge their frustration, show you understand'}
 
 INFORMATION FROM TOOLS:
 {tool_data}
 
 INFORMATION STILL NEEDED FROM CUSTOMER: {missing_info if missing_info else 'None - you have what you need'}
 
-=== RESPONSE GUIDELINES ===
-
-1. LANGUAGE MIRRORING:
-   You MUST mirror both the customer's language AND their writing style exactly.
-   If the customer uses romanized or mixed script, respond the same way.
-
-2. DE-ESCALATION (if needed = {needs_de_escalation}):
-   Start with empathy. Approach: {de_escalation_approach if de_escalation_approach else 'Acknowledge their frustration, show you understand'}
-
-3. MISSING INFORMATION (if needs_more_info = {needs_more_info}):
-   - Acknowledge their request warmly
-   - Ask specifically for: {missing_info}
-   - Explain what you'll do once you have it
-
-4. USING TOOL RESULTS:
-   - If verification done → mention you've verified their request
-   - If image analyzed → reference what was found
-   - If agent assigned → confirm help is on the way with ETA
-   - If ticket created → give them the ticket number and timeline
-   - If order/policy info retrieved → answer their question directly
-
-5. HANDLE TOOL ERRORS:
-   - If any tool shows "Error" or failed → acknowledge the issue
-   - For image_analysis error → politely ask customer to share the image again (it may not have uploaded properly)
-   - Don't pretend the tool worked if it failed
-   - IMPORTANT: If image_analysis failed, focus ONLY on getting a proper image. Do NOT offer agent connection yet.
-     Wait until image is successfully analyzed before offering to connect with an agent.
-
-6. OFFERING ESCALATION (only if needs_more_info = False AND you have all the info):
-   When ready to escalate, give two options:
-   - Option 1: Connect with agent (for refunds, replacements, complex issues)
-   - Option 2: Just sharing feedback (no agent needed, thank them)
-   Example: "Would you like me to connect you with an agent to help with this, or were you just sharing feedback?"
-   
-   IMPORTANT: If needs_more_info = True, do NOT offer escalation yet. Just ask for the missing info.
-
-7. BOT LIMITATIONS:
-   - Bot CANNOT process refunds, cancellations, or replacements directly
-   - For these requests: gather info → verify → then offer to connect with agent
-   - Never say "I'll process the refund" - say "I can connect you with an agent who can help with your refund"
-
-8. FORMAT:
-   - Keep responses extremely short: 1 sentence for most answers within 10-20 wods. Only 2 sentences if absolutely necessary. Be direct and helpful.
-   - Be warm but professional
-   - End with a helpful next step or question if appropriate
-   - Do NOT make up information that wasn't in the tool results
-   - Do NOT claim you did something if no tools were executed
+Follow the response guidelines from your instructions.
 
 Generate your response:"""
-
+        
+        return response_prompt
+    
+    async def _complete_response(self, response_prompt: str, cache_key: str) -> str:
+        """Generate the full response in one call and cache it"""
         try:
             response = await self.heart_llm.generate(
                 messages=[{"role": "user", "content": response_prompt}],
-                system_prompt="You are a helpful, empathetic customer support agent. Respond naturally and helpfully.",
+                system_prompt=_RESPONSE_SYSTEM_PROMPT,
                 temperature=0.4,
                 max_tokens=400
             )
@@ -460,12 +731,27 @@ Generate your response:"""
             logger.info("="*60)
             logger.info(f"Response length: {len(response)} chars")
             
+            self._cache_response(cache_key, response)
             return response
             
         except Exception as e:
             logger.error(f"❌ Response generation failed: {e}")
             return "I apologize, but I had trouble generating a response. Please try again."
     
+    def _response_cache_key(self, response_prompt: str) -> str:
+        """Cache key for a response: model + the fully rendered prompt"""
+        model = getattr(getattr(self.heart_llm, 'config', None), 'model', '')
+        return hashlib.sha256(f"{model}\n{response_prompt}".encode('utf-8')).hexdigest()
+    
+    def _cache_response(self, cache_key: str, response: str):
+        """Store a generated response, evicting the least recently used entry"""
+        if RESPONSE_CACHE_SIZE <= 0 or not response:
+            return
+        self._response_cache[cache_key] = response
+        self._response_cache.move_to_end(cache_key)
+        while len(self._response_cache) > RESPONSE_CACHE_SIZE:
+            self._response_cache.popitem(last=False)
+    
     def _format_tool_results(self, tool_results: dict) -> str:
         """Format tool results for response generation"""
         if not tool_results:
@@ -478,7 +764,7 @@ Generate your response:"""
             if not isinstance(result, dict):
                 continue
             if result.get('error'):
-                formatted.append(f"⚠️ {tool_key}: Error - {result.get('error')}")
+                formatted.append(f"⚠️ {tool_key}: Error - {_truncate(result.get('error'), TOOL_FIELD_MAX_CHARS)}")
                 continue
             if not result.get('success', True):
                 continue
@@ -492,7 +778,7 @@ Generate your response:"""
                 if data:
                     formatted.append("📦 ORDER/CUSTOMER INFORMATION:")
                     for key, value in data.items():
-                        formatted.append(f"  • {key}: {value}")
+                        formatted.append(f"  • {key}: {_truncate(value, TOOL_FIELD_MAX_CHARS)}")
                 else:
                     formatted.append("📦 ORDER INFO: No data found for this query")
             
@@ -500,7 +786,7 @@ Generate your response:"""
                 articles = result.get('articles', [])
                 retrieved = result.get('retrieved', '')
                 if retrieved:
-                    formatted.append(f"📚 KNOWLEDGE BASE:\n{retrieved}")
+                    formatted.append(f"📚 KNOWLEDGE BASE:\n{_truncate(retrieved, TOOL_RESULT_MAX_CHARS)}")
                 elif articles:
                     formatted.append("📚 KNOWLEDGE BASE RESULTS:")
                     for article in articles[:3]:
@@ -528,7 +814,7 @@ Generate your response:"""
                     formatted.append(f"  • Damage Detected: {analysis.get('damage_detected', 'unknown')}")
                     formatted.append(f"  • Type: {analysis.get('damage_type', 'N/A')}")
                     formatted.append(f"  • Severity: {analysis.get('severity', 'unknown')}")
-                    formatted.append(f"  • Description: {analysis.get('description', 'N/A')}")
+                    formatted.append(f"  • Description: {_truncate(analysis.get('description', 'N/A'), TOOL_FIELD_MAX_CHARS)}")
                     formatted.append(f"  • Recommendation: {analysis.get('recommendation', 'N/A')}")
                 if ai_detection.get('is_ai_generated'):
                     formatted.append("  ⚠️ Warning: Image may be AI-generated")
@@ -566,26 +852,11 @@ Generate your response:"""
         return "\n".join(formatted) if formatted else "No actionable tool results available."
 
     def _extract_json(self, response: str) -> str:
-        """Extract JSON from LLM response"""
-        response = response.strip()
-        
-        # Remove markdown code blocks
-        if response.startswith('```'):
-            lines = response.split('\n')
-            if lines[0].startswith('```'):
-                lines = lines[1:]
-            if lines and lines[-1].strip() == '```':
-                lines = lines[:-1]
-            response = '\n'.join(lines)
-        
-        # Find JSON boundaries
-        json_start = response.find('{')
-        json_end = response.rfind('}')
-        
-        if json_start != -1 and json_end != -1 and json_end > json_start:
-            return response[json_start:json_end+1]
-        
-        return response
+        """Extract JSON from LLM response (skips markdown fences and trailing text in one pass)"""
+        span = _find_json_span(response)
+        if span:
+            return response[span[0]:span[1]]
+        return response.strip()
     
     def _clean_response(self, response: str) -> str:
         """Clean final response for display"""
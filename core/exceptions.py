@@ -11,6 +11,13 @@ class LLMClientError(BrainHeartException):
     """LLM client related errors"""
     pass
 
+class LLMAPIError(LLMClientError):
+    """Non-success HTTP response from an LLM provider"""
+    def __init__(self, message: str, status: int = None, retry_after: float = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
 class BrainAgentError(BrainHeartException):
     """Brain agent specific errors"""
     pass
@@ -5,24 +5,104 @@ Simplified version to avoid import issues
 
 import asyncio
 import aiohttp
+import hashlib
 import json
 import logging
-from typing import Dict, List, Any, Optional
+import os
+import random
+import weakref
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
+from .exceptions import LLMAPIError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# Retries for transient provider failures (429, 5xx, connection errors)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_MAX_DELAY = 30.0
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+# In-flight request cap per provider/model, shared by every client in the process
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "10"))
+
+# Opt-in exact-match response cache for dev/test replays (LLM_CACHE=1).
+# Even low temperatures are not fully deterministic, so a replay returns the first sampled answer.
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "0") == "1"
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".llm_cache")
+
+def _read_cached_response(path: str) -> Optional[str]:
+    """Load a cached completion, or None if absent/unreadable"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["response"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _write_cached_response(path: str, response: str):
+    """Atomically store a completion in the disk cache"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"response": response}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def _is_retryable(error: Exception) -> bool:
+    """Whether an LLM request error is worth retrying"""
+    if isinstance(error, LLMAPIError):
+        return error.status in RETRYABLE_STATUSES
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in RETRYABLE_STATUSES
+    return isinstance(error, (aiohttp.ClientConnectionError, asyncio.TimeoutError))
+
+def _retry_after(headers) -> Optional[float]:
+    """Seconds the provider asked us to wait (Retry-After), if given as a number"""
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
 def remove_double_quotes(text: str) -> str:
     """Utility to remove double quotes from text"""
     if text.startswith('"') and text.endswith('"'):
         return text[1:-1]
     return text
 
+def create_shared_session() -> aiohttp.ClientSession:
+    """Create a pooled HTTP session that several LLMClients (and tools) can share (keep-alive + DNS cache)"""
+    connector = aiohttp.TCPConnector(limit=100, limit_per_host=50, keepalive_timeout=60, ttl_dns_cache=300)
+    return aiohttp.ClientSession(connector=connector)
+
+def _with_cache_control(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Mark system messages as cacheable for Anthropic models routed via OpenRouter"""
+    marked = []
+    for msg in messages:
+        if msg.get("role") == "system" and isinstance(msg.get("content"), str):
+            msg = {
+                "role": "system",
+                "content": [{
+                    "type": "text",
+                    "text": msg["content"],
+                    "cache_control": {"type": "ephemeral"}
+                }]
+            }
+        marked.append(msg)
+    return marked
+
+
 class LLMClient:
     """Universal async LLM client with multi-provider support"""
     
-    def __init__(self, config):
+    cache_stats = {"hits": 0, "misses": 0}
+    # Semaphores are bound to the loop they first wait on, so keep one set per event loop
+    _concurrency_limits = weakref.WeakKeyDictionary()
+    
+    def __init__(self, config, session: Optional[aiohttp.ClientSession] = None):
         self.config = config
-        self.session: Optional[aiohttp.ClientSession] = None
+        self.session: Optional[aiohttp.ClientSession] = session
+        self._owns_session = session is None
         
     async def __aenter__(self):
         await self.start_session()
@@ -36,13 +116,18 @@ class LLMClient:
         if not self.session:
             timeout = aiohttp.ClientTimeout(total=getattr(self.config, 'timeout', 30))
             self.session = aiohttp.ClientSession(timeout=timeout)
+            self._owns_session = True
     
     async def close_session(self):
-        """Close HTTP session"""
-        if self.session:
+        """Close HTTP session (shared sessions are closed by their owner)"""
+        if self.session and self._owns_session:
             await self.session.close()
             self.session = None
     
+    def _request_timeout(self) -> aiohttp.ClientTimeout:
+        """Per-request timeout so a shared session still honours this client's config"""
+        return aiohttp.ClientTimeout(total=getattr(self.config, 'timeout', 30))
+    
     async def generate(self, messages: List[Dict[str, str]], 
                       temperature: float,                       # ✅ REQUIRED parameter
                       system_prompt: Optional[str] = None,
@@ -61,18 +146,130 @@ class LLMClient:
         if system_prompt:
             messages = [{"role": "system", "content": system_prompt}] + messages
         
-        try:
-            if self.config.provider == 'anthropic':
-                return await self._anthropic_request(messages, temp, tokens)
-            elif self.config.provider == 'deepseek':
-                return await self._deepseek_request(messages, temp, tokens)
-            elif self.config.provider in ['openai', 'openrouter', 'groq']:
-                return remove_double_quotes(await self._openai_compatible_request(messages, temp, tokens, thinking))
-            else:
-                raise Exception(f"Unsupported provider: {self.config.provider}")
-        except Exception as e:
-            logger.error(f"❌ 🤖 Generation failed: {type(e).__name__}: {str(e)}")
-            raise Exception(f"Generation failed: {e}")
+        cache_path = self._cache_path(messages, temp, tokens, thinking) if LLM_CACHE_ENABLED else None
+        if cache_path:
+            cached = await asyncio.to_thread(_read_cached_response, cache_path)
+            if cached is not None:
+                LLMClient.cache_stats["hits"] += 1
+                logger.info(f"🎯 LLM cache HIT ({LLMClient.cache_stats})")
+                return cached
+            LLMClient.cache_stats["misses"] += 1
+        
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                async with self._concurrency_limit():
+                    response = await self._dispatch_request(messages, temp, tokens, thinking)
+                if cache_path:
+                    await asyncio.to_thread(_write_cached_response, cache_path, response)
+                return response
+            except Exception as e:
+                if attempt < LLM_MAX_RETRIES and _is_retryable(e):
+                    # Exponential backoff with jitter
+                    delay = min(LLM_RETRY_MAX_DELAY, 2 ** attempt) * random.uniform(0.5, 1.0)
+                    if getattr(e, "retry_after", None):
+                        # Provider told us how long to back off
+                        delay = min(LLM_RETRY_MAX_DELAY, max(delay, e.retry_after))
+                    logger.warning(f"⚠️ 🤖 {type(e).__name__} (attempt {attempt + 1}/{LLM_MAX_RETRIES + 1}), "
+                                   f"retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    continue
+                logger.error(f"❌ 🤖 Generation failed: {type(e).__name__}: {str(e)}")
+                raise Exception(f"Generation failed: {e}")
+    
+    async def generate_stream(self, messages: List[Dict[str, str]],
+                              temperature: float,
+                              system_prompt: Optional[str] = None,
+                              max_tokens: Optional[int] = None,
+                              thinking: Optional[bool] = False) -> AsyncIterator[str]:
+        """Stream response text as it is generated (OpenAI-compatible providers only)"""
+        if self.config.provider not in ['openai', 'openrouter', 'groq']:
+            raise Exception(f"Streaming not supported for provider: {self.config.provider}")
+        
+        if not self.session:
+            await self.start_session()
+        
+        tokens = max_tokens if max_tokens is not None else self.config.max_tokens
+        if system_prompt:
+            messages = [{"role": "system", "content": system_prompt}] + messages
+        
+        url, headers, payload = self._openai_compatible_setup(messages, temperature, tokens, thinking)
+        payload["stream"] = True
+        
+        # The concurrency slot covers only the request phase; reading the body is paced by the caller
+        async with self._concurrency_limit():
+            response = await self.session.post(url, headers=headers, json=payload,
+                                               timeout=self._request_timeout())
+        
+        # Breaking out of the iteration closes the response and cancels the rest of the generation
+        async with response:
+            if response.status != 200:
+                error_text = await response.text()
+                logger.error(f"❌ 🤖 {self.config.provider} stream error: {response.status}: {error_text}")
+                raise LLMAPIError(f"API error {response.status}: {error_text}", status=response.status,
+                                  retry_after=_retry_after(response.headers))
+            
+            # Thinking models may stream only 'reasoning' deltas; like the buffered path, that becomes
+            # the reply when no content arrives
+            reasoning_parts = []
+            content_seen = False
+            async for raw_line in response.content:
+                line = raw_line.decode("utf-8").strip()
+                # Skip blank keep-alives and SSE comments (e.g. ": OPENROUTER PROCESSING")
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                chunk = orjson.loads(data) if orjson is not None else json.loads(data)
+                choices = chunk.get("choices") or []
+                if choices:
+                    delta = choices[0].get("delta") or {}
+                    if delta.get("content"):
+                        content_seen = True
+                        yield delta["content"]
+                    elif delta.get("reasoning"):
+                        reasoning_parts.append(delta["reasoning"])
+            
+            if reasoning_parts:
+                reasoning = "".join(reasoning_parts)
+                self._log_reasoning(reasoning)
+                if not content_seen:
+                    logger.info(f"🧠 Thinking model detected - using streamed 'reasoning' field")
+                    yield reasoning
+    
+    def _concurrency_limit(self) -> asyncio.Semaphore:
+        """Semaphore shared by all clients on the running loop talking to the same provider/model"""
+        limits = LLMClient._concurrency_limits.setdefault(asyncio.get_running_loop(), {})
+        key = f"{self.config.provider}:{self.config.model}"
+        if key not in limits:
+            limits[key] = asyncio.Semaphore(max(1, LLM_MAX_CONCURRENCY))
+        return limits[key]
+    
+    def _cache_path(self, messages: List[Dict[str, Any]], temperature: float,
+                    max_tokens: int, thinking: bool) -> str:
+        """Disk cache file for an exact (model, messages, sampling) combination"""
+        key_data = json.dumps({
+            "provider": self.config.provider,
+            "model": self.config.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "thinking": bool(thinking)
+        }, sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha256(key_data.encode("utf-8")).hexdigest()
+        return os.path.join(LLM_CACHE_DIR, f"{digest}.json")
+    
+    async def _dispatch_request(self, messages: List[Dict[str, str]], temperature: float,
+                                max_tokens: int, thinking: bool) -> str:
+        """Route a single request to the configured provider"""
+        if self.config.provider == 'anthropic':
+            return await self._anthropic_request(messages, temperature, max_tokens)
+        elif self.config.provider == 'deepseek':
+            return await self._deepseek_request(messages, temperature, max_tokens)
+        elif self.config.provider in ['openai', 'openrouter', 'groq']:
+            return remove_double_quotes(await self._openai_compatible_request(messages, temperature, max_tokens, thinking))
+        else:
+            raise Exception(f"Unsupported provider: {self.config.provider}")
         
     
     async def _deepseek_request(self, messages: List[Dict[str, str]], 
@@ -97,11 +294,11 @@ class LLMClient:
         }
         
         # Make async request
-        async with aiohttp.ClientSession() as session:
-            async with session.post(api_url, headers=headers, json=payload) as response:
-                response.raise_for_status()
-                result = await response.json()
-                return result["choices"][0]["message"]["content"]
+        async with self.session.post(api_url, headers=headers, json=payload,
+                                     timeout=self._request_timeout()) as response:
+            response.raise_for_status()
+            result = await response.json()
+            return result["choices"][0]["message"]["content"]
             
         
         
@@ -133,12 +330,18 @@ class LLMClient:
         }
         
         if system_content:
-            payload["system"] = system_content
+            # Static system prefix is cached server-side across calls
+            payload["system"] = [{
+                "type": "text",
+                "text": system_content,
+                "cache_control": {"type": "ephemeral"}
+            }]
         
         async with self.session.post(
             "https://api.anthropic.com/v1/messages",
             headers=headers,
-            json=payload
+            json=payload,
+            timeout=self._request_timeout()
         ) as response:
             
             logger.info(f"🤖 Anthropic response status: {response.status}")
@@ -146,14 +349,15 @@ class LLMClient:
             if response.status != 200:
                 error_text = await response.text()
                 logger.error(f"❌ 🤖 Anthropic API error: {response.status}: {error_text}")
-                raise Exception(f"API error {response.status}: {error_text}")
+                raise LLMAPIError(f"API error {response.status}: {error_text}", status=response.status,
+                                  retry_after=_retry_after(response.headers))
             
             result = await response.json()
             return result["content"][0]["text"]
     
-    async def _openai_compatible_request(self, messages: List[Dict[str, str]], 
-                                       temperature: float, max_tokens: int, thinking:bool) -> str:
-        """Handle OpenAI-compatible API requests"""
+    def _openai_compatible_setup(self, messages: List[Dict[str, str]], temperature: float,
+                                 max_tokens: int, thinking: bool) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        """Build URL, headers and payload for an OpenAI-compatible chat completion"""
         
         headers = {
             "Authorization": f"Bearer {self.config.api_key}",
@@ -163,6 +367,8 @@ class LLMClient:
         if self.config.provider == 'openrouter':
             headers["HTTP-Referer"] = "https://github.com/brain-heart-research"
             headers["X-Title"] = "Brain-Heart Research System"
+            if self.config.model.startswith('anthropic/'):
+                messages = _with_cache_control(messages)
         
         if thinking:
             logger.info(f"🧠 Thinking mode enabled for {self.config.provider} model {self.config.model}")
@@ -194,7 +400,16 @@ class LLMClient:
         else:
             url = "https://api.openai.com/v1/chat/completions"
         
-        async with self.session.post(url, headers=headers, json=payload) as response:
+        return url, headers, payload
+    
+    async def _openai_compatible_request(self, messages: List[Dict[str, str]], 
+                                       temperature: float, max_tokens: int, thinking:bool) -> str:
+        """Handle OpenAI-compatible API requests"""
+        
+        url, headers, payload = self._openai_compatible_setup(messages, temperature, max_tokens, thinking)
+        
+        async with self.session.post(url, headers=headers, json=payload,
+                                     timeout=self._request_timeout()) as response:
             
             logger.info(f"🤖 {self.config.provider} response status: {response.status}")
             
@@ -202,11 +417,12 @@ class LLMClient:
             
             if response.status != 200:
                 logger.error(f"❌ 🤖 {self.config.provider} API error: {response.status}: {response_text}")
-                raise Exception(f"API error {response.status}: {response_text}")
+                raise LLMAPIError(f"API error {response.status}: {response_text}", status=response.status,
+                                  retry_after=_retry_after(response.headers))
             
             # Safe JSON parsing with better error handling
             try:
-                result = json.loads(response_text)
+                result = orjson.loads(response_text) if orjson is not None else json.loads(response_text)
             except json.JSONDecodeError as e:
                 logger.error(f"❌ 🤖 JSON parse error: {response_text[:100]}...")
                 raise Exception(f"Invalid JSON from {self.config.provider}: '{response_text[:200]}...' Error: {e}")
@@ -222,11 +438,7 @@ class LLMClient:
                 logger.info(f"🧠 Thinking model detected - using 'reasoning' field")
                 
                 # Show the FULL reasoning/thinking process
-                print(f"\n{'='*80}")
-                print(f"💭 FULL THINKING PROCESS (RAW):")
-                print(f"{'='*80}")
-                print(reasoning)
-                print(f"{'='*80}\n")
+                self._log_reasoning(reasoning)
                 
                 content = reasoning
             elif "reasoning" in message and message.get("content"):
@@ -234,11 +446,7 @@ class LLMClient:
                 reasoning = message["reasoning"]
                 logger.info(f"🧠 Thinking model with both fields")
                 
-                print(f"\n{'='*80}")
-                print(f"💭 FULL THINKING PROCESS (RAW):")
-                print(f"{'='*80}")
-                print(reasoning)
-                print(f"{'='*80}\n")
+                self._log_reasoning(reasoning)
             
             # Check if we hit token limit
             if choice.get("finish_reason") == "length":
@@ -252,6 +460,11 @@ class LLMClient:
             
             return content
     
+    def _log_reasoning(self, reasoning: str):
+        """Log raw thinking output at DEBUG (skips building the large message otherwise)"""
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"💭 FULL THINKING PROCESS (RAW):\n{'='*80}\n{reasoning}\n{'='*80}")
+    
     def get_model_info(self) -> Dict[str, str]:
         """Get model information"""
         return {
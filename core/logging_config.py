@@ -4,12 +4,28 @@ Centralized logging configuration for the Brain-Heart Agent API
 Provides file-based logging with rotation and console output
 """
 
+import atexit
 import logging
 import os
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from pathlib import Path
 
+# Background listener that drains the log queue (see setup_logging)
+_queue_listener = None
+
+
+def _stop_queue_listener():
+    """Flush and stop the background log listener, if running"""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+atexit.register(_stop_queue_listener)
+
 
 def setup_logging(log_dir: str = "logs", log_file: str = "api.log", 
                   max_bytes: int = 10_000_000, backup_count: int = 5,
@@ -29,8 +45,11 @@ def setup_logging(log_dir: str = "logs", log_file: str = "api.log",
         - Automatic log rotation when file size exceeds max_bytes
         - Keeps backup_count number of old log files
         - UTF-8 encoding for emoji and special character support
-        - Captures all logs including raw thinking processes
+        - Raw thinking processes are logged at DEBUG, so only captured when log_level=logging.DEBUG
+        - Non-blocking: callers only enqueue records, a background thread
+          does the console/file writes
     """
+    global _queue_listener
     
     # Create logs directory if it doesn't exist
     log_path = Path(log_dir)
@@ -52,12 +71,12 @@ def setup_logging(log_dir: str = "logs", log_file: str = "api.log",
     
     # Remove any existing handlers to avoid duplicates
     root_logger.handlers.clear()
+    _stop_queue_listener()
     
     # Console Handler (StreamHandler) - for terminal output
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(log_level)
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
     
     # File Handler (RotatingFileHandler) - for persistent logs with rotation
     file_handler = RotatingFileHandler(
@@ -68,7 +87,12 @@ def setup_logging(log_dir: str = "logs", log_file: str = "api.log",
     )
     file_handler.setLevel(log_level)
     file_handler.setFormatter(formatter)
-    root_logger.addHandler(file_handler)
+    
+    # Queue Handler - request paths only enqueue; the listener thread does the I/O
+    log_queue = queue.Queue(-1)
+    root_logger.addHandler(QueueHandler(log_queue))
+    _queue_listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+    _queue_listener.start()
     
     # Log initial setup message
     root_logger.info("=" * 80)
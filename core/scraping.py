@@ -18,6 +18,11 @@ from trafilatura.settings import use_config
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Built once; trafilatura's EXTRACTION_TIMEOUT relies on SIGALRM, which only works on the
+# main thread, so it is disabled now that extraction runs in a worker thread
+_TRAFILATURA_CONFIG = use_config()
+_TRAFILATURA_CONFIG.set("DEFAULT", "EXTRACTION_TIMEOUT", "0")
+
 
 def clean_text(text: str) -> str:
     """
@@ -89,6 +94,31 @@ def clean_text(text: str) -> str:
     return text.strip()
 
 
+def _extract_links(html: str, url: str, base_domain: str, ignore_ids: bool) -> set:
+    """Same-domain absolute links found in html (blocking; run in a worker thread)"""
+    soup = BeautifulSoup(html, "html.parser")
+    links = set()
+
+    for tag in soup.find_all("a", href=True):
+        href = tag["href"]
+
+        # Remove #fragment if needed
+        if ignore_ids:
+            href = href.split("#")[0]
+
+        if not href:
+            continue
+
+        # Convert relative → absolute
+        absolute_url = urljoin(url, href)
+
+        # Check same domain
+        if urlparse(absolute_url).hostname == base_domain:
+            links.add(absolute_url)
+
+    return links
+
+
 async def get_links(url: str, base_domain: str, ignore_ids: bool = True):
     try:
         async with httpx.AsyncClient(timeout=5.0, follow_redirects=True) as client:
@@ -98,27 +128,7 @@ async def get_links(url: str, base_domain: str, ignore_ids: bool = True):
 
             html = resp.text
 
-        soup = BeautifulSoup(html, "html.parser")
-        links = set()
-
-        for tag in soup.find_all("a", href=True):
-            href = tag["href"]
-
-            # Remove #fragment if needed
-            if ignore_ids:
-                href = href.split("#")[0]
-
-            if not href:
-                continue
-
-            # Convert relative → absolute
-            absolute_url = urljoin(url, href)
-
-            # Check same domain
-            if urlparse(absolute_url).hostname == base_domain:
-                links.add(absolute_url)
-
-        return links
+        return await asyncio.to_thread(_extract_links, html, url, base_domain, ignore_ids)
 
     except Exception:
         print(f"Failed to fetch: {url}")
@@ -166,6 +176,102 @@ async def crawl(
     return list(visited)
 
 
+def _extract_page(html: str, url: str, domain: str) -> Optional[Dict[str, str]]:
+    """Extract main text and metadata from fetched HTML (blocking; run in a worker thread)"""
+    # Extract content using trafilatura (best for articles)
+    try:
+        content = extract(
+            html,
+            config=_TRAFILATURA_CONFIG,
+            include_comments=False,
+            include_tables=True,
+            include_images=False,
+            output_format='txt',
+            url=url
+        )
+    except Exception as e:
+        logger.warning(f"Trafilatura failed: {str(e)}")
+        content = None
+    
+    # Fallback to BeautifulSoup if trafilatura fails
+    if not content:
+        try:
+            soup = BeautifulSoup(html, 'html.parser')
+            
+            # Remove unwanted elements
+            for element in soup(["script", "style", "nav", "footer", "header", "aside"]):
+                element.decompose()
+            
+            # Try to find main content
+            main_content = (
+                soup.find('main') or 
+                soup.find('article') or 
+                soup.find('div', {'role': 'main'}) or
+                soup.find('div', {'class': re.compile(r'content|main|article', re.I)}) or
+                soup.body or 
+                soup
+            )
+            
+            # Extract text
+            content = main_content.get_text(separator='\n', strip=True)
+            
+            # Clean up whitespace
+            content = re.sub(r'\n\s*\n+', '\n\n', content)
+            content = re.sub(r' +', ' ', content)
+            
+        except Exception as e:
+            logger.error(f"BeautifulSoup extraction failed: {str(e)}")
+            return None
+    
+    if not content or len(content.strip()) < 100:
+        logger.error(f"Insufficient content extracted from {url}")
+        return None
+    
+    # Extract metadata
+    try:
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        # Get title
+        title = None
+        if soup.title:
+            title = soup.title.string.strip()
+        elif soup.find('h1'):
+            title = soup.find('h1').get_text(strip=True)
+        
+        # Get description
+        description = None
+        meta_desc = soup.find('meta', attrs={'name': 'description'})
+        if meta_desc and meta_desc.get('content'):
+            description = meta_desc['content'].strip()
+        
+        # Get author if available
+        author = None
+        meta_author = soup.find('meta', attrs={'name': 'author'})
+        if meta_author and meta_author.get('content'):
+            author = meta_author['content'].strip()
+            
+    except Exception as e:
+        logger.warning(f"Metadata extraction failed: {str(e)}")
+        title = description = author = None
+    
+    # Generate unique document ID
+    doc_id = hashlib.sha256(url.encode()).hexdigest()[:16]
+    
+    # Build result
+    result = {
+        "url": url,
+        "doc_id": doc_id,
+        "content": clean_text(content.strip()),
+        "title": title or "",
+        "description": description or "",
+        "author": author or "",
+        "domain": domain,
+        "content_length": len(content.strip())
+    }
+    
+    return result
+
+
 async def scrape_website(
     url: str,
     timeout: int = 30,
@@ -260,101 +366,10 @@ async def scrape_website(
         else:
             return None
     
-    # Extract content using trafilatura (best for articles)
-    try:
-        config = use_config()
-        config.set("DEFAULT", "EXTRACTION_TIMEOUT", "30")
-        
-        content = extract(
-            html,
-            config=config,
-            include_comments=False,
-            include_tables=True,
-            include_images=False,
-            output_format='txt',
-            url=url
-        )
-    except Exception as e:
-        logger.warning(f"Trafilatura failed: {str(e)}")
-        content = None
-    
-    # Fallback to BeautifulSoup if trafilatura fails
-    if not content:
-        try:
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            # Remove unwanted elements
-            for element in soup(["script", "style", "nav", "footer", "header", "aside"]):
-                element.decompose()
-            
-            # Try to find main content
-            main_content = (
-                soup.find('main') or 
-                soup.find('article') or 
-                soup.find('div', {'role': 'main'}) or
-                soup.find('div', {'class': re.compile(r'content|main|article', re.I)}) or
-                soup.body or 
-                soup
-            )
-            
-            # Extract text
-            content = main_content.get_text(separator='\n', strip=True)
-            
-            # Clean up whitespace
-            content = re.sub(r'\n\s*\n+', '\n\n', content)
-            content = re.sub(r' +', ' ', content)
-            
-        except Exception as e:
-            logger.error(f"BeautifulSoup extraction failed: {str(e)}")
-            return None
-    
-    if not content or len(content.strip()) < 100:
-        logger.error(f"Insufficient content extracted from {url}")
-        return None
-    
-    # Extract metadata
-    try:
-        soup = BeautifulSoup(html, 'html.parser')
-        
-        # Get title
-        title = None
-        if soup.title:
-            title = soup.title.string.strip()
-        elif soup.find('h1'):
-            title = soup.find('h1').get_text(strip=True)
-        
-        # Get description
-        description = None
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        if meta_desc and meta_desc.get('content'):
-            description = meta_desc['content'].strip()
-        
-        # Get author if available
-        author = None
-        meta_author = soup.find('meta', attrs={'name': 'author'})
-        if meta_author and meta_author.get('content'):
-            author = meta_author['content'].strip()
-            
-    except Exception as e:
-        logger.warning(f"Metadata extraction failed: {str(e)}")
-        title = description = author = None
-    
-    # Generate unique document ID
-    doc_id = hashlib.sha256(url.encode()).hexdigest()[:16]
-    
-    # Build result
-    result = {
-        "url": url,
-        "doc_id": doc_id,
-        "content": clean_text(content.strip()),
-        "title": title or "",
-        "description": description or "",
-        "author": author or "",
-        "domain": parsed.netloc,
-        "content_length": len(content.strip())
-    }
-    
-    logger.info(f"Successfully scraped {url} ({result['content_length']} chars)")
+    # Parsing is CPU-bound; keep it off the event loop so concurrent scrapes keep fetching
+    result = await asyncio.to_thread(_extract_page, html, url, parsed.netloc)
+    if result:
+        logger.info(f"Successfully scraped {url} ({result['content_length']} chars)")
     return result
 
 
@@ -12,6 +12,8 @@ import re
 import sqlite3
 import os
 import logging
+import time
+import traceback
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 from abc import ABC, abstractmethod
@@ -24,6 +26,30 @@ import ast
 from redis.asyncio import Redis
 
 logger = logging.getLogger(__name__)
+
+# Lines dropped from scraped pages: link farms with 3+ URLs, image embeds and Jina's
+# generated "Image N:" alt lines. Blank lines, headings and short fact lines are kept.
+_DROP_LINE = re.compile(r"(?m)^(?:.*http.*http.*http.*|!\[.*|Image \d+:.*)$\n?")
+
+# Per-page token budget for scraped content handed to the LLM
+SCRAPE_TOKEN_BUDGET = int(os.getenv("SCRAPE_TOKEN_BUDGET", "1500"))
+
+
+# Outbound scrape limits shared by every search on a WebSearchTool
+MAX_CONCURRENT_SCRAPES = 8
+
+# Minimum seconds between full tracebacks for repeated RAG failures
+RAG_TRACEBACK_INTERVAL = float(os.getenv("RAG_TRACEBACK_INTERVAL", "1.0"))
+
+
+def _trim_to_token_budget(text: str, max_tokens: int) -> str:
+    """Trim text to roughly max_tokens (~4 chars/token), cutting at a line boundary"""
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind('\n', 0, max_chars)
+    return text[:cut if cut > 0 else max_chars].rstrip()
+
 class BaseTool(ABC):
     """Base class for all tools"""
     
@@ -243,6 +269,7 @@ class WebSearchTool(BaseTool):
         self.provider = provider
         self.web_model = web_model
         self.session = None
+        self._scrape_semaphore = asyncio.Semaphore(MAX_CONCURRENT_SCRAPES)
         self.quota_manager = QuotaManager()
         
         
@@ -309,7 +336,11 @@ class WebSearchTool(BaseTool):
         self.stats["total_searches"] += 1
         
         if not self.session:
-            self.session = aiohttp.ClientSession()
+            # Bounded pool: keeps concurrent searches from exhausting sockets. Every scrape hits
+            # r.jina.ai, so the per-host limit must fit the scrape semaphore - otherwise scrapes
+            # queue for a connection inside their request timeout
+            connector = aiohttp.TCPConnector(limit=32, limit_per_host=MAX_CONCURRENT_SCRAPES, ttl_dns_cache=300)
+            self.session = aiohttp.ClientSession(connector=connector)
         
         if not self.available_providers:
             return {
@@ -714,7 +745,7 @@ class WebSearchTool(BaseTool):
         try:
             logger.info(f"   🌐 Using LLMLayer...")
             
-            response = await search_llmlayer(query, self.llmlayer_key, self.llmlayer_url)
+            response = await search_llmlayer(query, self.llmlayer_key, self.llmlayer_url, session=self.session)
             answer, sources = response.get("answer", ""), response.get("sources", [])
             
             return {
@@ -770,7 +801,7 @@ class WebSearchTool(BaseTool):
                 logger.debug(f"      ⚠️ [{idx+1}] {scraped}")
                 results[idx]["scraped_content"] = scraped
             else:
-                results[idx]["scraped_content"] = scraped[:20000]  # Limit to 20000 chars
+                results[idx]["scraped_content"] = _trim_to_token_budget(scraped, SCRAPE_TOKEN_BUDGET)
                 scraped_count += 1
                 self.stats["total_scraped"] += 1
                 logger.debug(f"       [{idx+1}] Scraped {len(scraped)} chars")
@@ -794,14 +825,18 @@ class WebSearchTool(BaseTool):
                 "Accept": "text/plain"
             }
             
-            async with self.session.get(jina_url, headers=headers, timeout=15) as response:
-                if response.status == 200:
-                    content = await response.text()
-                    if len(content) < 100:
-                        return "[Content too short]"
-                    return content.strip()
-                else:
-                    return f"[HTTP {response.status}]"
+            async with self._scrape_semaphore:
+                async with self.session.get(jina_url, headers=headers, timeout=15) as response:
+                    if response.status == 200:
+                        content = await response.text()
+                        if len(content) < 100:
+                            return "[Content too short]"
+                        content = _DROP_LINE.sub('', content).strip()
+                        if not content:
+                            return "[Content too short]"
+                        return content
+                    else:
+                        return f"[HTTP {response.status}]"
                     
         except asyncio.TimeoutError:
             return "[Timeout]"
@@ -837,6 +872,8 @@ class RAGTool(BaseTool):
     """RAG tool using user-specific ChromaDB collections"""
     def __init__(self):
         super().__init__("rag", "Retrieve information from uploaded knowledge base")
+        self._last_traceback_at = 0.0
+        self._suppressed_tracebacks = 0
         logger.info("RAGTool initialized")
     
     async def execute(self, query: str, user_id: str = None, **kwargs) -> Dict[str, Any]:
@@ -930,9 +967,16 @@ class RAGTool(BaseTool):
             logger.error(f"   Exception: {str(e)}")
             logger.error(f"   Query: '{query[:50]}...'")
             
-            # Log full traceback for debugging
-            import traceback
-            logger.error(f"   Traceback: {traceback.format_exc()}")
+            # Log full traceback for debugging, but not for every failure in a burst
+            now = time.monotonic()
+            if now - self._last_traceback_at < RAG_TRACEBACK_INTERVAL:
+                self._suppressed_tracebacks += 1
+            else:
+                if self._suppressed_tracebacks:
+                    logger.error(f"   ({self._suppressed_tracebacks} repeated tracebacks suppressed)")
+                logger.error(f"   Traceback: {traceback.format_exc()}")
+                self._last_traceback_at = now
+                self._suppressed_tracebacks = 0
             
             return {
                 "success": False,
@@ -965,6 +1009,11 @@ class ToolManager:
         self.use_premium_search = use_premium_search
         self.tools: Dict[str, BaseTool] = {}
         
+        # Optional integrations; stay None unless attached later (see initialize_zapier_async note)
+        self._zapier_manager = None
+        self._mongodb_manager = None
+        self._query_agent = None
+        
         self._initialize_tools()
         
         logger.info(f"ToolManager initialized with web model: {web_model}")
@@ -1187,37 +1236,24 @@ class ToolManager:
         
         logger.info("🧹 Cleaning up tools...")
         
-        # Cleanup standard tools
-        for name, tool in self.tools.items():
-            if hasattr(tool, 'close'):
-                try:
-                    await tool.close()
-                    logger.debug(f"     Closed {name}")
-                except Exception as e:
-                    logger.warning(f"   ⚠️ Error closing {name}: {str(e)}")
-        
-        # Cleanup Zapier
-        if self._zapier_manager:
-            try:
-                await self._zapier_manager.close()
-                logger.debug("     Closed Zapier MCP")
-            except Exception as e:
-                logger.warning(f"   ⚠️ Error closing Zapier MCP: {str(e)}")
-        
-        # Cleanup MongoDB
-        if self._mongodb_manager:
-            try:
-                await self._mongodb_manager.disconnect()
-                logger.debug("     Closed MongoDB MCP")
-            except Exception as e:
-                logger.warning(f"   ⚠️ Error closing MongoDB MCP: {str(e)}")
-        
-        # Cleanup QueryAgent
-        if self._query_agent:
-            try:
-                await self._query_agent.close()
-                logger.debug("     Closed QueryAgent")
-            except Exception as e:
-                logger.warning(f"   ⚠️ Error closing QueryAgent: {str(e)}")
-        
-        logger.info("  Tool cleanup complete")
\ No newline at end of file
+        # Independent teardowns - run them together so shutdown waits for the slowest, not the sum
+        async with asyncio.TaskGroup() as tg:
+            for name, tool in self.tools.items():
+                if hasattr(tool, 'close'):
+                    tg.create_task(self._close_resource(name, tool.close))
+            if self._zapier_manager:
+                tg.create_task(self._close_resource("Zapier MCP", self._zapier_manager.close))
+            if self._mongodb_manager:
+                tg.create_task(self._close_resource("MongoDB MCP", self._mongodb_manager.disconnect))
+            if self._query_agent:
+                tg.create_task(self._close_resource("QueryAgent", self._query_agent.close))
+        
+        logger.info("  Tool cleanup complete")
+    
+    async def _close_resource(self, name: str, close) -> None:
+        """Await one close callable, logging failures so sibling teardowns keep running"""
+        try:
+            await close()
+            logger.debug(f"     Closed {name}")
+        except Exception as e:
+            logger.warning(f"   ⚠️ Error closing {name}: {str(e)}")
@@ -10,6 +10,7 @@ from os import getenv
 import aiohttp
 import asyncio
 import logging
+from typing import Optional
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -99,7 +100,31 @@ async def search_perplexity(query: str, model: str = 'perplexity/sonar') -> str:
         # Return a structured error response instead of failing
         return f"Search failed: {str(e)}. Please check your OPENROUTER_API_KEY and try again."
 
-async def search_llmlayer(query: str, api_key: str, api_url: str) -> str:
+async def _post_llmlayer(session: aiohttp.ClientSession, api_url: str, headers: dict, payload: dict) -> dict:
+    """POST an LLMLayer answer request on the given session"""
+    async with session.post(
+        api_url, 
+        headers=headers, 
+        json=payload, 
+        timeout=aiohttp.ClientTimeout(total=60)
+    ) as response:
+        
+        if response.status != 200:
+            error_text = await response.text()
+            raise Exception(f"LLMLayer API error {response.status}: {error_text[:200]}")
+        
+        data = await response.json()
+        answer = data.get("answer", "")
+        sources = data.get("sources", [])
+        
+        if not answer:
+            raise Exception("No answer received from LLMLayer")
+        
+        logger.info(f"✅ LLMLayer search completed: {len(answer)} characters")
+        return {"answer":answer, "sources": sources}
+
+async def search_llmlayer(query: str, api_key: str, api_url: str,
+                          session: Optional[aiohttp.ClientSession] = None) -> str:
     """
     Search using LLMLayer API - returns pre-formatted answer
     
@@ -107,6 +132,7 @@ async def search_llmlayer(query: str, api_key: str, api_url: str) -> str:
         query: Search query (can be comma-separated for multiple queries)
         api_key: LLMLayer API key
         api_url: LLMLayer API endpoint
+        session: Optional shared ClientSession; a temporary one is used if omitted
     
     Returns:
         Pre-formatted text response
@@ -127,28 +153,11 @@ async def search_llmlayer(query: str, api_key: str, api_url: str) -> str:
             "location": "in"
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                api_url, 
-                headers=headers, 
-                json=payload, 
-                timeout=aiohttp.ClientTimeout(total=60)
-            ) as response:
-                
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"LLMLayer API error {response.status}: {error_text[:200]}")
-                
-                data = await response.json()
-                answer = data.get("answer", "")
-                sources = data.get("sources", [])
-                
-                if not answer:
-                    raise Exception("No answer received from LLMLayer")
-                
-                logger.info(f"✅ LLMLayer search completed: {len(answer)} characters")
-                return {"answer":answer, "sources": sources}
-                
+        if session is None:
+            async with aiohttp.ClientSession() as temp_session:
+                return await _post_llmlayer(temp_session, api_url, headers, payload)
+        return await _post_llmlayer(session, api_url, headers, payload)
+        
     except Exception as e:
         error_msg = f"LLMLayer search failed: {str(e)}"
         logger.error(error_msg)
@@ -32,6 +32,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Ceiling on concurrent vision calls when analyzing a whole folder
+MAX_CONCURRENT_IMAGES = int(os.getenv("MAX_CONCURRENT_IMAGES", "4"))
+
 
 def load_image_as_base64(image_path: str) -> str:
     """Load a local image file and convert to base64 data URL"""
@@ -86,8 +89,8 @@ async def test_single_image(tool: ImageAnalysisTool, image_path: str,
         product_name=product_name
     )
     
-    # Display results
-    print(f"\n📊 Results:")
+    # Display results (named, since concurrent runs interleave output)
+    print(f"\n📊 Results for {Path(image_path).name}:")
     print(f"   Success: {result.get('success')}")
     
     if result.get('success'):
@@ -176,7 +179,13 @@ async def test_all_images_in_folder(tool: ImageAnalysisTool, folder_path: str):
     
     print(f"\n📁 Found {len(images)} images in {folder_path}")
     
-    results = []
+    semaphore = asyncio.Semaphore(max(1, MAX_CONCURRENT_IMAGES))
+    
+    async def gated(coro):
+        async with semaphore:
+            return await coro
+    
+    tasks = []
     for image_path in images:
         # Use filename as context hint
         filename = image_path.stem.lower()
@@ -190,10 +199,18 @@ async def test_all_images_in_folder(tool: ImageAnalysisTool, folder_path: str):
         elif 'defect' in filename:
             query = "The product has a defect"
         
-        result = await test_single_image(tool, str(image_path), customer_query=query)
+        tasks.append(gated(test_single_image(tool, str(image_path), customer_query=query)))
+    
+    # Images are independent - analyze them concurrently, bounded to avoid provider 429s
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    results = []
+    for image_path, outcome in zip(images, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"❌ {image_path.name} failed: {outcome}")
+            outcome = None
         results.append({
             'image': image_path.name,
-            'result': result
+            'result': outcome
         })
     
     # Summary
@@ -226,10 +243,8 @@ async def main():
     print(f"   VISION_MODEL: {os.getenv('VISION_MODEL', 'openai/gpt-4o')} (default)")
     print(f"   OPENROUTER_API_KEY: {'✅ Set' if os.getenv('OPENROUTER_API_KEY') else '❌ Not set'}")
     
-    # Initialize tool
-    tool = ImageAnalysisTool()
-    
-    try:
+    # Initialize tool (session is closed on exit, even on errors)
+    async with ImageAnalysisTool() as tool:
         if args.url:
             # Test with URL
             await test_with_url(tool, args.url, args.query)
@@ -240,8 +255,6 @@ async def main():
             # Test all images in folder
             folder_path = os.path.join(os.path.dirname(__file__), args.folder)
             await test_all_images_in_folder(tool, folder_path)
-    finally:
-        await tool.close()
     
     print("\n✅ Test complete!")
 
@@ -17,38 +17,33 @@ async def test_raise_ticket():
         print("❌ Missing environment variables. Please set RAISE_TICKET_BASE_URL and BUSINESS_ID in .env")
         return
     
-    # Initialize the tool
-    tool = RaiseTicketTool(
+    # Initialize the tool (its session is closed when the block exits)
+    async with RaiseTicketTool(
         base_url=base_url,
         business_id=business_id,
         api_key=None  # No API key needed
-    )
-    
-    try:
-        # Test ticket creation
-        result = await tool.execute(
-            user_id="916306755990",
-            subject="Test Issue ",
-            description="This is a test ticket created via the API",
-            priority="high",
-            category="order",
-            customerName="Faizan",
-            channel="whatsapp"
-        )
+    ) as tool:
+        try:
+            # Test ticket creation
+            result = await tool.execute(
+                user_id="916306755990",
+                subject="Test Issue ",
+                description="This is a test ticket created via the API",
+                priority="high",
+                category="order",
+                customerName="Faizan",
+                channel="whatsapp"
+            )
+            
+            print("✅ Test Result:")
+            print(f"Success: {result.get('success')}")
+            print(f"Ticket ID: {result.get('ticket_id')}")
+            print(f"Message: {result.get('message')}")
+            if result.get('ticket'):
+                print(f"Full Ticket Data: {result['ticket']}")
         
-        print("✅ Test Result:")
-        print(f"Success: {result.get('success')}")
-        print(f"Ticket ID: {result.get('ticket_id')}")
-        print(f"Message: {result.get('message')}")
-        if result.get('ticket'):
-            print(f"Full Ticket Data: {result['ticket']}")
-    
-    except Exception as e:
-        print(f"❌ Test failed: {str(e)}")
-    
-    finally:
-        # Clean up
-        await tool.close()
+        except Exception as e:
+            print(f"❌ Test failed: {str(e)}")
 
 if __name__ == "__main__":
     asyncio.run(test_raise_ticket())
\ No newline at end of file